@@ -1,15 +1,124 @@
+import argparse
+import socket
 import curses
-from .game import Game
 
+from .game import Game, ReplayGame, NetGame
+from .profiler import TickProfiler
+from .replay import ReplayReader
+from .net import Connection
+from .tournament import parse_size, load_policy
+from .sparse import SPARSE_AREA
+from .cast import CastRecorder
+from .scores import ScoreStore, sqlite3
+from .events import EventBus
+from .exeptions import FileFormatError, ConnectionLost
+from . import settings, state
 
-def go(stdscr):
-    Game(stdscr).run()  # Start game
+
+def go(stdscr, args):
+    cast = None
+    if args.cast is not None:
+        height, width = stdscr.getmaxyx()
+        cast = CastRecorder(args.cast, width, height)
+    try:
+        if args.connect is not None:
+            game = NetGame(stdscr, args.connect, cast=cast, backend=args.renderer)
+        elif args.replay is not None:
+            game = ReplayGame(stdscr, args.replay, args.speed, args.seek, cast=cast,
+                              backend=args.renderer)
+        else:
+            game = Game(stdscr, record=args.record, profiler=args.profiler, cast=cast, arena=args.arena,
+                        save=args.resume or settings.SAVE_FILE, size=args.size, backend=args.renderer,
+                        scores=args.scores, events=args.events)
+        try:
+            game.run()  # Start game
+        finally:
+            game.close()
+    finally:
+        if cast is not None:
+            cast.close()
+        if args.scores is not None:
+            args.scores.close()
+        args.events.close()
+        if args.profiler is not None:
+            args.profiler.dump(args.profile_out)
 
 
 def main():
+    parser = argparse.ArgumentParser(prog='pysnake', description='A curses-based Snake game')
+    parser.add_argument('--record', metavar='FILE', help='record the game to a replay file')
+    parser.add_argument('--replay', metavar='FILE', help='play back a replay file')
+    parser.add_argument('--speed', type=float, default=1.0, help='replay speed multiplier')
+    parser.add_argument('--seek', type=int, default=0, metavar='TICK', help='start replay from the tick')
+    parser.add_argument('--profile-out', metavar='FILE',
+                        help='profile game ticks, save the summary to a JSON (or .csv) file on exit')
+    parser.add_argument('--size', type=parse_size, metavar='WxH',
+                        help='arena size, up to 10000x10000 (default: the screen size), the view follows the snake')
+    parser.add_argument('--resume', metavar='FILE',
+                        help="resume a saved game, '%s' saves back to FILE" % settings.KEYS_SAVE[0])
+    parser.add_argument('--connect', metavar='HOST:PORT', help='join a pysnake-server game')
+    parser.add_argument('--cast', metavar='FILE',
+                        help='record the session to an asciicast v2 file (gzip-compressed if FILE ends with .gz)')
+    parser.add_argument('--renderer', choices=('curses', 'ansi', 'null'), default='curses',
+                        help='arena output: curses, ANSI sequences written directly or none (default: curses)')
+    parser.add_argument('--scores', metavar='FILE', default=settings.SCORES_FILE,
+                        help="SQLite database of scores, '%s' shows the best (default: %s)" % (
+                            settings.KEYS_SCORES[0], settings.SCORES_FILE))
+    parser.add_argument('--plugin', action='append', dest='plugins', default=[], metavar='MODULE:CALLABLE',
+                        help='call CALLABLE with the game events bus to subscribe to events, see pysnake.events')
+    args = parser.parse_args()
+    args.profiler = TickProfiler() if args.profile_out is not None else None
+
+    if args.replay is not None:
+        try:
+            args.replay = ReplayReader(args.replay)
+        except (IOError, FileFormatError) as e:
+            parser.error('%s: %s' % (args.replay, e))
+
+    if args.size is not None:
+        if min(args.size) < 3 or max(args.size) > 10000:
+            parser.error('--size: arena sides must be from 3 to 10000')
+        if args.record is not None and args.size[0] * args.size[1] > SPARSE_AREA:
+            parser.error('--record: arenas over %d blocks can not be recorded' % SPARSE_AREA)
+
+    args.arena = None
+    if args.resume is not None:
+        try:
+            args.arena = state.resume(args.resume)
+        except (IOError, FileFormatError) as e:
+            parser.error('%s: %s' % (args.resume, e))
+
+    if args.connect is not None:
+        host, _, port = args.connect.rpartition(':')
+        try:
+            args.connect = Connection(host or '127.0.0.1', int(port))
+        except (ValueError, socket.error, FileFormatError, ConnectionLost) as e:
+            parser.error('%s: %s' % (args.connect, e))
+
+    args.events = EventBus()
+    try:
+        for spec in args.plugins:
+            load_policy(spec)(args.events)
+    except (ImportError, AttributeError, ValueError) as e:
+        parser.error('--plugin: %s' % e)
+
+    # Scores of local games only
+    if args.replay is None and args.connect is None:
+        try:
+            args.scores = ScoreStore(args.scores)
+        except ImportError:
+            args.scores = None  # No sqlite3
+        except sqlite3.Error as e:
+            parser.error('%s: %s' % (args.scores, e))
+    else:
+        args.scores = None
+
     # Curses convinient wrapper
-    curses.wrapper(go)
+    try:
+        curses.wrapper(go, args)
+    except ConnectionLost as e:
+        parser.exit(1, '%s\n' % e)
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -1,18 +1,81 @@
 from collections import deque
+from array import array
 import random
-import curses
 import copy
 
 from .exeptions import TooSmallScreen
 from . import settings
 
+try:
+    import numpy
+except ImportError:  # NumPy is optional, used only for grid views
+    numpy = None
+
+# Block kind codes stored in arena grid, one byte per block
+CODE_EFIR = 0
+CODE_BORDER = 1
+CODE_SNAKE = 2
+CODE_FOOD = 3
+
 
 class Arena(object):
     """
     Encapsulates Snake Game's arena structure
+
+    The arena is stored as a grid of block kind codes, one byte per block,
+    plus a small dict of food colors. Block objects are only built on demand
+    (get_block, rendering), so memory use and construction time are about
+    an order of magnitude lower than keeping an object per block.
     """
-    def __init__(self, width, height):
-        """Create a new Arena instance"""
+    sparse = False  # Only taken blocks are stored, see pysnake.sparse
+
+    def __init__(self, width, height, track_touched=True, seed=None):
+        """
+        Create a new Arena instance
+
+        Set track_touched to False for headless arenas
+        that are never rendered, seed makes food placement reproducible
+        """
+        self.init_state(width, height, track_touched, seed)
+
+        # Build arena as grid of block codes, index is y * width + x
+        self.grid = bytearray(self.width * self.height)  # Filled with empty blocks
+        self.colors = {}  # Colors of food blocks by index
+
+        # Draw the arena's border
+        self.set_border()
+
+        # Index of free (empty) blocks: array of their grid indexes and
+        # position of every block in that array (-1 if the block isn't free)
+        self.free = array('i')
+        self.free_pos = array('i', [-1]) * (self.width * self.height)
+        inner_width = self.width - 2
+        for y in range(1, self.height - 1):
+            start = y * self.width + 1
+            self.free_pos[start:start + inner_width] = array('i', range(len(self.free), len(self.free) + inner_width))
+            self.free.extend(range(start, start + inner_width))
+        self.food_count = 0
+
+        # Initially all the blocks are touched
+        self.refresh()
+
+        self.init_snake()
+
+    @classmethod
+    def from_grid(cls, width, height, grid, free, free_pos, track_touched=True):
+        """Arena with ready grid and free blocks index, without building them (the snake is to be set)"""
+        arena = cls.__new__(cls)
+        arena.init_state(width, height, track_touched, None)
+        arena.grid = grid
+        arena.colors = {}
+        arena.free = free
+        arena.free_pos = free_pos
+        arena.food_count = grid.count(bytearray([CODE_FOOD]))
+        arena.refresh()
+        return arena
+
+    def init_state(self, width, height, track_touched, seed):
+        """Size, counters and settings, everything but the blocks"""
         # Arena size
         self.width = width
         self.height = height
@@ -21,14 +84,22 @@ class Arena(object):
             raise TooSmallScreen('Small arena size.')
 
         # Inits
-        self.touched_blocks = []  # Touched blocks since last render
+        self.random = random.Random(seed)  # Own random generator for food
+        self.track_touched = track_touched
+        self.touched_blocks = []  # Indexes of touched blocks since last render
+        self.touched_all = False  # All the blocks are touched since last render
+        self.changes = None  # List of overwritten blocks (index, code, color) while journaling
         self.moves_all = 0
         self.moves_from_eat = 0
         self.eat_count = 0
         self.direction = None
         self.prev_direction = None
         self.block_under_head = None
-        self.last_snake_tail = None
+        self.last_tail = None  # Index of the block the tail left by the last move, None if the snake grew
+        self.offsets = {
+            settings.MOVE_UP: -width, settings.MOVE_DOWN: width,
+            settings.MOVE_LEFT: -1, settings.MOVE_RIGHT: 1,
+        }  # Grid index offsets of directions
         self.misdirection = [
             (settings.MOVE_UP, settings.MOVE_DOWN),
             (settings.MOVE_DOWN, settings.MOVE_UP),
@@ -36,85 +107,160 @@ class Arena(object):
             (settings.MOVE_RIGHT, settings.MOVE_LEFT)
         ]  # Prevent occasional "game over" when pressing reverse direction keys
 
-        # Build arena as dictionary with keys (x, y)
-        self.arena = {}
-        for y in range(self.height):
-            for x in range(self.width):
-                    self.set_block(BlockEfir(x, y))  # Fill arena with empty blocks
-
-        # Draw the arena's border
-        self.set_border()
-
-        # Init snake
-        # Snake's body is the python deque object
-        # See https://docs.python.org/3.4/library/collections.html#collections.deque
-        self.snake_body = deque(maxlen=1)
-        head = BlockSnake(self.width // 2, self.height // 2)
-        self.snake_body.append(head)
-        self.set_block(head)
+    def init_snake(self):
+        """Put the snake in the middle of arena"""
+        # Snake's body is a deque of grid indexes, the head is in the end.
+        # Growth is a counter of moves the tail stays in place for, so eating
+        # doesn't copy the body. The grid itself tells whether a block is
+        # the snake's one.
+        head = (self.height // 2) * self.width + self.width // 2
+        self.snake_body = deque([head])
+        self.snake_growth = 0
+        self.write(head, CODE_SNAKE)
 
     def __iter__(self):
         """Yields only touched blocks"""
-        for block in self.touched_blocks:
-            yield block
+        touched_blocks = self.pop_touched()
+        if touched_blocks is None:
+            touched_blocks = range(self.width * self.height)
+        for index in touched_blocks:
+            yield self.block_at(index)
+
+    def pop_touched(self):
+        """Take indexes of touched blocks (None if all the blocks are touched)"""
+        touched_blocks = None if self.touched_all else self.touched_blocks
         self.touched_blocks = []
+        self.touched_all = False
+        return touched_blocks
 
     def set_block(self, block):
         """Set arena block"""
-        self.arena[block.x, block.y] = block
-        self.touched_blocks.append(block)
+        self.write(block.y * self.width + block.x, block.code, block.color)
+
+    def write(self, index, code, color=0):
+        """Set arena block by its grid index and code"""
+        old_code = self.grid[index]
+        if self.changes is not None:
+            self.changes.append((index, old_code, self.colors.get(index, 0)))
+        if old_code != code:
+            # Keep the free blocks index up to date
+            if old_code == CODE_EFIR:
+                self.free_remove(index)
+            elif code == CODE_EFIR:
+                self.free_add(index)
+            if old_code == CODE_FOOD:
+                self.food_count -= 1
+            elif code == CODE_FOOD:
+                self.food_count += 1
+            self.grid[index] = code
+        if color:
+            self.colors[index] = color
+        elif index in self.colors:
+            del self.colors[index]
+        if self.track_touched:
+            self.touched_blocks.append(index)
+
+    def free_add(self, index):
+        """Add block to the free blocks index"""
+        self.free_pos[index] = len(self.free)
+        self.free.append(index)
+
+    def free_remove(self, index):
+        """Remove block from the free blocks index (swap with the last one)"""
+        pos = self.free_pos[index]
+        last = self.free.pop()
+        if last != index:
+            self.free[pos] = last
+            self.free_pos[last] = pos
+        self.free_pos[index] = -1
+
+    def reindex(self, free=None):
+        """Rebuild the free blocks index from the grid or given free block indexes in their order"""
+        if free is None:
+            free = (index for index, code in enumerate(self.grid) if code == CODE_EFIR)
+        self.free = array('i')
+        self.free_pos = array('i', [-1]) * (self.width * self.height)
+        for index in free:
+            self.free_add(index)
+        self.food_count = self.grid.count(bytearray([CODE_FOOD]))
+
+    def has_space(self):
+        """Is there any empty or food block left"""
+        return bool(self.free) or self.food_count > 0
 
     def get_block(self, x, y):
         """Get arena block"""
-        return self.arena[x, y]
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            raise KeyError((x, y))
+        return self.block_at(y * self.width + x)
+
+    def block_at(self, index):
+        """Build block by its grid index"""
+        y, x = divmod(index, self.width)
+        return BLOCKS[self.grid[index]](x, y, self.colors.get(index, 0))
 
     def get_blocks(self, which):
         """Get all blocks of the specified type"""
-        blocks = filter(lambda bl: any([bl == block for block in which]), self.arena.values())
-        return blocks
+        codes = set(block.code for block in which)
+        for index, code in enumerate(self.grid):
+            if code in codes:
+                yield self.block_at(index)
+
+    def view(self):
+        """NumPy (height, width) array sharing memory with the grid"""
+        if numpy is None:
+            raise ImportError('Arena grid view requires NumPy')
+        return numpy.frombuffer(self.grid, numpy.uint8).reshape(self.height, self.width)
 
     def set_border(self):
         """Draw arena's border"""
-        for x in range(self.width):  # Horizontal borders
-            self.set_block(BlockBorder(x, 0))
-            self.set_block(BlockBorder(x, self.height - 1))
-        for y in range(self.height):  # Vertical borders
-            self.set_block(BlockBorder(0, y))
-            self.set_block(BlockBorder(self.width - 1, y))
+        width, height, grid = self.width, self.height, self.grid
+        border_row = bytearray([CODE_BORDER]) * width
+        grid[:width] = border_row  # Horizontal borders
+        grid[(height - 1) * width:] = border_row
+        grid[::width] = bytearray([CODE_BORDER]) * height  # Vertical borders
+        grid[width - 1::width] = bytearray([CODE_BORDER]) * height
 
     def new_food(self, num=1):
-        """Generate food in random empty block"""
-        # Get all empty blocks
-        blocks_efir = list(self.get_blocks([BlockEfir]))
-        # Randomize blocks
-        random.shuffle(blocks_efir)
-        for block in blocks_efir[:num]:
-            self.set_block(BlockFood(block.x, block.y))
+        """Generate food in random empty block, returns grid indexes of the food"""
+        placed = []
+        for _ in range(num):
+            if not self.free:
+                break
+            # Pick random block from the free blocks index
+            index = self.free[self.random.randrange(len(self.free))]
+            y, x = divmod(index, self.width)
+            self.set_block(BlockFood(x, y, self.random.randrange(1, 7)))
+            placed.append(index)
+        return placed
 
     def refresh(self):
         """Touch all the blocks of arena"""
-        self.touched_blocks = []
-        all_blocks = self.arena.values()
-        self.touched_blocks.extend(all_blocks)
+        if self.track_touched:
+            self.touched_blocks = []
+            self.touched_all = True
 
     @property
     def snake_length(self):
-        return len(self.snake_body)
+        return len(self.snake_body) + self.snake_growth
 
     @property
     def snake_head(self):
-        return self.snake_body[-1]  # Head in end of deque
+        y, x = divmod(self.snake_body[-1], self.width)  # Head in end of deque
+        return BlockSnake(x, y)
 
     @property
     def snake_tail(self):
-        return self.snake_body[0]  # Tail in begining of deque
+        y, x = divmod(self.snake_body[0], self.width)  # Tail in begining of deque
+        return BlockSnake(x, y)
+
+    def is_snake(self, index):
+        """Is the block with the grid index a part of the snake"""
+        return self.grid[index] == CODE_SNAKE
 
     def snake_grow(self, delta=1):
-        """Snake grows"""
-        new_length = self.snake_body.maxlen + delta
-        self.snake_body = deque(self.snake_body, new_length)
-        # Fill new body
-        self.snake_body.extendleft([None] * delta)
+        """Snake grows, by the next moves"""
+        self.snake_growth += delta
 
     def snake_eat(self, count=1):
         """Snake eats"""
@@ -125,35 +271,27 @@ class Arena(object):
 
     def snake_go(self):
         """Driving of snake"""
-        self.last_snake_tail = self.snake_tail
-
         # Prevent misdirection
         if self.snake_length > 1:
             if (self.prev_direction, self.direction) in self.misdirection:
                 self.direction = self.prev_direction
         self.prev_direction = self.direction
 
-        # Cloning head
-        head = self.snake_head.clone()
+        body = self.snake_body
+        head = body[-1] + self.offsets.get(self.direction, 0)
+
+        # Tail moves first, unless the snake grows
+        if self.snake_growth:
+            self.snake_growth -= 1
+            self.last_tail = None
+        else:
+            self.last_tail = body.popleft()
+            self.write(self.last_tail, CODE_EFIR)
 
         # Move head
-        if self.direction == settings.MOVE_UP:
-            head.y -= 1  # Go up
-        elif self.direction == settings.MOVE_DOWN:
-            head.y += 1  # Go down
-        elif self.direction == settings.MOVE_RIGHT:
-            head.x += 1  # Go right
-        elif self.direction == settings.MOVE_LEFT:
-            head.x -= 1  # Go left
-
-        # Append new head to body
-        self.snake_body.append(head)
-
-        # Amend snake's blocks (erase tail and set new head)
-        if self.last_snake_tail:
-            self.set_block(BlockEfir(self.last_snake_tail.x, self.last_snake_tail.y))
-        self.block_under_head = self.get_block(self.snake_head.x, self.snake_head.y)
-        self.set_block(BlockSnake(self.snake_head.x, self.snake_head.y))
+        self.block_under_head = self.block_at(head)
+        body.append(head)
+        self.write(head, CODE_SNAKE)
 
         # Update stats
         self.moves_all += 1
@@ -164,15 +302,19 @@ class Block(object):
     """
     Base class for blocks of arena
     """
+    __slots__ = ('x', 'y', 'color')
+
     kind = ''  # Block type
-    curses_attr = 0  # Curses attributes
+    code = None  # Block code in arena grid
 
-    def __init__(self, x, y):
+    def __init__(self, x, y, color=0):
         """
-        Create new block with given co-ordinates
+        Create new block with given co-ordinates and color number,
+        0 is the default terminal color
         """
         self.x = x
         self.y = y
+        self.color = color
 
     def __str__(self):
         return self.kind
@@ -190,27 +332,37 @@ class Block(object):
 
 class BlockEfir(Block):
     """Representative of empty arena space"""
+    __slots__ = ()
     kind = settings.ARENA_EFIR
+    code = CODE_EFIR
 
 
 class BlockSnake(Block):
     """Snake's body block"""
+    __slots__ = ()
     kind = settings.ARENA_SNAKE
+    code = CODE_SNAKE
 
 
 class BlockBorder(Block):
     """Arena's border block"""
+    __slots__ = ()
     kind = settings.ARENA_BRICK
+    code = CODE_BORDER
 
 
 class BlockFood(Block):
     """Arena's food block"""
+    __slots__ = ()
     kind = settings.ARENA_FOOD
+    code = CODE_FOOD
 
-    def __init__(self, x, y):
+    def __init__(self, x, y, color=0):
         """
-        Create new block with random color
+        Create new block with given or random color
         """
-        super(BlockFood, self).__init__(x, y)
-        if curses.has_colors():
-            self.curses_attr |= curses.color_pair(random.randrange(1, 7))
+        super(BlockFood, self).__init__(x, y, color or random.randrange(1, 7))
+
+
+# Block classes by their codes
+BLOCKS = (BlockEfir, BlockBorder, BlockSnake, BlockFood)
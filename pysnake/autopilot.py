@@ -0,0 +1,462 @@
+"""
+Autopilot
+
+Steers the snake along a Hamiltonian cycle of the arena, cutting it short
+toward food where that can't trap the snake, so it wins on arenas with an
+even number of inner blocks. With an odd number no cycle visits every block
+and the one left out is entered only for food in it: the snake fills the
+arena but for up to three blocks, then it usually runs into its body or
+circles around food it can't take. A snake out of the cycle's order, after a rewind or when
+the autopilot takes over, steers by a field of distances to the nearest
+food, updated incrementally as the head takes blocks and the tail frees
+them, and takes a move only if its tail stays reachable.
+"""
+
+from array import array
+from heapq import heapify, heappush, heappop
+from itertools import islice
+import weakref
+
+from .arena import CODE_EFIR, CODE_FOOD
+from .profiler import perf_counter, Samples
+from . import settings
+
+INF = 2 ** 30  # Distance of blocked or unreachable blocks
+
+# Can the snake go into the block, by block kind code
+PASSABLE = [False] * 256
+PASSABLE[CODE_EFIR] = PASSABLE[CODE_FOOD] = True
+
+MOVES = (
+    (settings.MOVE_UP, 0, -1), (settings.MOVE_DOWN, 0, 1),
+    (settings.MOVE_LEFT, -1, 0), (settings.MOVE_RIGHT, 1, 0),
+)
+
+FOOD = bytearray([CODE_FOOD])
+
+
+def find_foods(grid):
+    """Indexes of food blocks in the grid"""
+    foods = []
+    index = grid.find(FOOD)
+    while index >= 0:
+        foods.append(index)
+        index = grid.find(FOOD, index + 1)
+    return foods
+
+
+def hamiltonian_cycle(width, height):
+    """
+    Next block index for every inner block of the arena along a cycle
+    visiting all of them, None if there is no such cycle
+
+    With an odd number of inner blocks no cycle visits all of them, the top
+    left one is left out then and leads to the next block of the cycle.
+    """
+    inner_width, inner_height = width - 2, height - 2
+    if inner_width < 2 or inner_height < 2:
+        return None
+    corner = None
+    if inner_width % 2 and inner_height % 2:
+        # Along the first row but the corner, zigzag down and up the columns
+        # but the first two, zigzag up those, through the corner's neighbors
+        path = [(x, 0) for x in range(1, inner_width)]
+        for x in range(inner_width - 1, 1, -1):
+            ys = range(1, inner_height) if x % 2 == (inner_width - 1) % 2 else range(inner_height - 1, 0, -1)
+            path.extend((x, y) for y in ys)
+        for y in range(inner_height - 1, 0, -1):
+            path.extend([(1, y), (0, y)] if y % 2 == (inner_height - 1) % 2 else [(0, y), (1, y)])
+        corner = (0, 0)
+    else:
+        transpose = inner_height % 2 != 0
+        if transpose:
+            inner_width, inner_height = inner_height, inner_width
+
+        # Along the first row, zigzag back through the other rows, up the first column
+        path = [(x, 0) for x in range(inner_width)]
+        for y in range(1, inner_height):
+            xs = range(inner_width - 1, 0, -1) if y % 2 else range(1, inner_width)
+            path.extend((x, y) for x in xs)
+        path.extend((0, y) for y in range(inner_height - 1, 0, -1))
+        if transpose:
+            path = [(y, x) for x, y in path]
+
+    indexes = [(y + 1) * width + x + 1 for x, y in path]
+    cycle = array('i', [-1]) * (width * height)
+    for index, next_index in zip(indexes, indexes[1:] + indexes[:1]):
+        cycle[index] = next_index
+    if corner is not None:
+        cycle[width + 1] = indexes[0]
+    return cycle
+
+
+def cycle_order(cycle, width):
+    """
+    Position of every block along the cycle in half steps, the block left
+    out of the cycle is half a step after its neighbor it is entered from;
+    -1 for blocks off the arena's inside
+    """
+    order = array('i', [-1]) * len(cycle)
+    index = cycle.index(max(cycle))  # Any block of the cycle
+    position = 0
+    while order[index] < 0:
+        order[index] = position
+        index = cycle[index]
+        position += 2
+    for index, next_index in enumerate(cycle):
+        if next_index >= 0 and order[index] < 0:
+            for neighbor in (index - width, index + width, index - 1, index + 1):
+                if neighbor != next_index and order[neighbor] >= 0:
+                    order[index] = order[neighbor] + 1
+    return order
+
+
+class DistanceField(object):
+    """
+    Distances from empty and food blocks to the nearest food
+
+    Only the distances up to the head's one plus a margin are kept, farther
+    blocks are at INF until the field is extended. Freeing a block or placing
+    food only shortens distances, the new ones are propagated from the block.
+    Blocking a block, eaten food too, invalidates only the blocks all shortest
+    paths of which went through it, they are repaired from their neighbors.
+    When the last food is eaten the field starts over from the new one.
+    """
+    def __init__(self, arena, margin=8):
+        self.width = arena.width
+        self.offsets = (-arena.width, arena.width, -1, 1)
+        self.margin = margin  # Blocks beyond the head's distance kept
+        self.build(arena)
+
+    def build(self, arena, bounded=True):
+        """Compute the distances from scratch, up to the head's one and the margin if bounded"""
+        self.grid = grid = bytearray(arena.grid)  # Block codes the distances are for
+        self.foods = set(find_foods(grid))
+        self.dist = dist = array('i', [INF]) * len(grid)
+        self.limit = INF  # Farthest distance kept
+        head = arena.snake_body[-1]
+        frontier = list(self.foods)
+        for index in frontier:
+            dist[index] = 0
+        distance = 0
+        while frontier and distance < self.limit:
+            distance += 1
+            next_frontier = []
+            for index in frontier:
+                for offset in self.offsets:
+                    neighbor = index + offset
+                    if dist[neighbor] == INF and PASSABLE[grid[neighbor]]:
+                        dist[neighbor] = distance
+                        next_frontier.append(neighbor)
+                    elif neighbor == head and bounded and self.limit == INF:
+                        self.limit = distance + self.margin
+            frontier = next_frontier
+
+    def extend(self, arena):
+        """Keep all the distances, when the head went beyond the kept ones"""
+        if self.limit < INF:
+            self.build(arena, bounded=False)
+
+    def update(self, arena, indexes):
+        """Catch up with the arena, where only the blocks with given indexes could change"""
+        grid, foods = self.grid, self.foods
+        eaten = set(index for index in indexes if grid[index] == CODE_FOOD and arena.grid[index] != CODE_FOOD)
+        if eaten and eaten == foods:
+            return self.build(arena)
+        for index in indexes:
+            old, new = grid[index], arena.grid[index]
+            if old == new:
+                continue
+            grid[index] = new
+            if new == CODE_FOOD:
+                foods.add(index)
+                self.propagate([(0, index)])
+            elif old == CODE_FOOD:
+                foods.discard(index)
+                self.block(index)
+            elif PASSABLE[new] and not PASSABLE[old]:
+                self.free(index)
+            elif PASSABLE[old] and not PASSABLE[new]:
+                self.block(index)
+
+    def propagate(self, heap):
+        """Lower distances from (distance, index) candidates on, up to the limit"""
+        dist, grid, offsets, limit = self.dist, self.grid, self.offsets, self.limit
+        while heap:
+            distance, index = heappop(heap)
+            if distance >= dist[index] or distance > limit:
+                continue
+            dist[index] = distance
+            distance += 1
+            for offset in offsets:
+                neighbor = index + offset
+                if distance < dist[neighbor] and distance <= limit and PASSABLE[grid[neighbor]]:
+                    heappush(heap, (distance, neighbor))
+
+    def free(self, index):
+        best = min(self.dist[index + offset] for offset in self.offsets)
+        if best < INF:
+            self.propagate([(best + 1, index)])
+
+    def block(self, index):
+        dist, offsets = self.dist, self.offsets
+        distance = dist[index]
+        dist[index] = INF
+        if distance == INF:
+            return
+
+        # Invalidate blocks left without a neighbor one step closer to food, nearest first
+        invalid = []
+        heap = [(distance + 1, index + offset) for offset in offsets if dist[index + offset] == distance + 1]
+        heapify(heap)
+        while heap:
+            distance, index = heappop(heap)
+            if dist[index] != distance:
+                continue
+            if any(dist[index + offset] == distance - 1 for offset in offsets):
+                continue
+            dist[index] = INF
+            invalid.append(index)
+            for offset in offsets:
+                if dist[index + offset] == distance + 1:
+                    heappush(heap, (distance + 1, index + offset))
+
+        # Repair them from the valid neighbors
+        heap = []
+        for index in invalid:
+            best = min(dist[index + offset] for offset in offsets)
+            if best < INF:
+                heap.append((best + 1, index))
+        heapify(heap)
+        self.propagate(heap)
+
+
+class Autopilot(object):
+    """
+    Chooses the snake's direction every tick
+
+    decide(arena) is called before the engine step, the time it takes
+    is kept in the time attribute and the times rolling window.
+
+    While the snake's body lies in the Hamiltonian cycle's order, from the
+    tail to the head, it goes along the cycle and cuts it short toward food
+    only over empty blocks ahead of the head, so the body stays in the order
+    and the snake can't trap itself. Otherwise it takes the cycle's next
+    block when its tail stays reachable from there, which gets the body in
+    the order, or goes down the distance field.
+    """
+    def __init__(self, hamilton_ratio=0.5, slack=24, window=1000):
+        self.hamilton_ratio = hamilton_ratio  # Snake length to arena area ratio to stop cutting the cycle from
+        self.slack = slack  # Empty blocks left ahead of the growth after cutting the cycle, for more food on the way
+        self.times = Samples(window)
+        self.time = 0.0  # Seconds of the last decision
+        self.arena = None
+        self.moves = 0
+        self.foods = set()
+        self.field = None  # Distance field, kept while the body is out of the order
+        self.cycle = None
+        self.order = None  # Blocks' positions along the cycle in half steps
+        self.area = 0
+        self.lap = 0  # Half steps around the cycle
+        self.planned = -1  # Block chosen along the cycle at the last decision
+        self.ordered = False  # Is the body in the cycle's order
+
+    def sync(self, arena):
+        """Bring the food, the distance field and the cycle order up to date with the arena"""
+        if arena is self.arena and arena.moves_all == self.moves:
+            return
+        head = arena.snake_body[-1]
+        if arena is self.arena and arena.moves_all == self.moves + 1:
+            indexes = [head]
+            if arena.last_tail is not None:
+                indexes.append(arena.last_tail)
+            foods = self.foods
+            foods.discard(head)
+            if arena.food_count > len(foods):
+                # Food was placed, look for it only now
+                placed = set(find_foods(arena.grid)) - foods
+                foods.update(placed)
+                indexes.extend(placed)
+            if self.field is not None:
+                self.field.update(arena, indexes)
+            if self.cycle is not None:
+                self.ordered = head == self.planned if self.ordered else self.in_order(arena)
+        else:
+            # New game, rewind or the first decision
+            if self.arena is None or (arena.width, arena.height) != (self.arena.width, self.arena.height):
+                self.cycle = hamiltonian_cycle(arena.width, arena.height)
+                self.order = cycle_order(self.cycle, arena.width) if self.cycle is not None else None
+                self.area = (arena.width - 2) * (arena.height - 2)
+                self.lap = 2 * (self.area - self.area % 2)
+            self.foods = set(find_foods(arena.grid))
+            self.field = None
+            self.ordered = self.cycle is not None and self.in_order(arena)
+        self.arena = arena
+        self.moves = arena.moves_all
+
+    def in_order(self, arena):
+        """Do the body's blocks go along the cycle from the tail to the head within one lap"""
+        order, lap, body = self.order, self.lap, arena.snake_body
+        steps = 0
+        for index, next_index in zip(body, islice(body, 1, None)):
+            steps += (order[next_index] - order[index]) % lap
+        return steps < lap
+
+    def decide(self, arena):
+        """Direction of the next step, None if there is no way to go"""
+        start = perf_counter()
+        self.sync(arena)
+        direction = self.choose(arena)
+        self.time = perf_counter() - start
+        self.times.add(self.time)
+        return direction
+
+    def choose(self, arena):
+        width, grid = arena.width, arena.grid
+        head = arena.snake_body[-1]
+        tail = -1 if arena.snake_growth else arena.snake_body[0]  # Tail moves away unless the snake grows
+
+        moves = []
+        for direction, dx, dy in MOVES:
+            if arena.snake_length > 1 and (arena.prev_direction, direction) in arena.misdirection:
+                continue
+            index = head + dy * width + dx
+            if PASSABLE[grid[index]] or (index == tail and arena.snake_length > 1):
+                moves.append((direction, index))
+        self.planned = -1
+        if not moves:
+            return None
+
+        if self.ordered:
+            direction = self.follow(arena, moves)
+            if direction is not None:
+                self.field = None
+                return direction
+
+        if self.field is None:
+            self.field = DistanceField(arena)
+        dist = self.field.dist
+        if all(dist[index] == INF for direction, index in moves):
+            self.field.extend(arena)  # Went beyond the kept distances
+            dist = self.field.dist
+        candidates = sorted((dist[index], direction, index) for direction, index in moves)
+
+        if self.cycle is not None:
+            for distance, direction, index in candidates:
+                if index == self.cycle[head] and self.safe(arena, index):
+                    return direction
+
+        for distance, direction, index in candidates:
+            if self.safe(arena, index):
+                return direction
+        # The tail is out of reach anyway, take the most room
+        return max(candidates, key=lambda candidate: self.room(arena, candidate[2]))[1]
+
+    def follow(self, arena, moves):
+        """
+        Direction along the cycle or cutting it short as far as it keeps the
+        body in the order, short of the food and with room to grow ahead
+        """
+        order, lap, body = self.order, self.lap, arena.snake_body
+        head = body[-1]
+        position = order[head]
+        tail_ahead = (order[body[0]] - position) % lap or lap  # Half steps ahead of the head to the tail
+        food_ahead = min([(order[food] - position) % lap for food in self.foods] or [lap])
+        if food_ahead >= tail_ahead:
+            food_ahead = -1  # The food is behind the head, it is on the way once the tail passes it
+        long = arena.snake_length >= self.hamilton_ratio * self.area
+        best = following = None
+        for direction, index in moves:
+            ahead = (order[index] - position) % lap
+            if index == self.cycle[head]:
+                following = (ahead, direction, index)
+            elif ahead <= food_ahead:
+                growth = max(arena.snake_growth - 1, 0) + (3 if arena.grid[index] == CODE_FOOD else 0)
+                if order[index] % 2:
+                    slack = 0  # Into the block left out of the cycle, the only way there
+                elif long:
+                    continue
+                else:
+                    slack = self.slack
+                if ahead + 2 * (growth + slack) >= tail_ahead:
+                    continue
+            if ahead <= food_ahead and (best is None or ahead > best[0]):
+                best = (ahead, direction, index)
+        best = best or following
+        if best is None:
+            return None
+        self.planned = best[2]
+        return best[1]
+
+    @staticmethod
+    def safe(arena, index):
+        """
+        Could the snake follow its tail after going into the block
+
+        The tail stays put while the snake grows, so the block it is in has
+        to be reachable by a path long enough for it to move away by then,
+        or the room reachable has to be larger than the snake.
+        """
+        body, width = arena.snake_body, arena.width
+        if arena.snake_length == 1:
+            return True
+        eat = 3 if arena.grid[index] == CODE_FOOD else 0
+        if arena.snake_growth:
+            growth = arena.snake_growth - 1 + eat  # Growth left after the move
+            target = body[0]
+            free = -1
+        else:
+            growth = eat
+            target = body[1]  # The tail's block is free after the move
+            free = body[0]
+        need = growth + 1  # Steps from the block to the target it is free after
+        target_y, target_x = divmod(target, width)
+
+        # Greedy best-first search, usually the tail is found in a few steps
+        grid = arena.grid
+        offsets = (-width, width, -1, 1)
+        limit = arena.snake_length + growth
+        steps = {index: 0}  # Block -> steps to it along the search's path
+        heap = [(0, index)]
+        while heap:
+            _, index = heappop(heap)
+            step = steps[index] + 1
+            for offset in offsets:
+                neighbor = index + offset
+                if neighbor == target and step >= need:
+                    return True
+                if neighbor in steps or not (PASSABLE[grid[neighbor]] or neighbor == free):
+                    continue
+                steps[neighbor] = step
+                if len(steps) > limit:
+                    return True
+                y, x = divmod(neighbor, width)
+                heappush(heap, (abs(x - target_x) + abs(y - target_y), neighbor))
+        return False
+
+    @staticmethod
+    def room(arena, index):
+        """Empty blocks reachable from the block, counted up to the snake's length"""
+        grid, width, limit = arena.grid, arena.width, arena.snake_length
+        offsets = (-width, width, -1, 1)
+        seen = set([index])
+        stack = [index]
+        while stack and len(seen) < limit:
+            index = stack.pop()
+            for offset in offsets:
+                neighbor = index + offset
+                if neighbor not in seen and PASSABLE[grid[neighbor]]:
+                    seen.add(neighbor)
+                    stack.append(neighbor)
+        return len(seen)
+
+
+_pilots = weakref.WeakKeyDictionary()  # Engine -> its autopilot
+
+
+def autopilot_policy(engine):
+    """Headless policy for pysnake.tournament, every engine has its own autopilot"""
+    pilot = _pilots.get(engine)
+    if pilot is None:
+        pilot = _pilots[engine] = Autopilot()
+    return pilot.decide(engine.arena)
@@ -0,0 +1,195 @@
+"""
+Batched game engine stepping many arenas at once with NumPy
+
+The rules are the ones of Arena.snake_go() and Engine.rules(), applied
+with array operations to every arena of the batch. Requires NumPy.
+"""
+
+from collections import namedtuple
+
+import numpy
+
+from .arena import CODE_EFIR, CODE_BORDER, CODE_SNAKE, CODE_FOOD
+from .exeptions import TooSmallScreen
+from . import settings
+
+# Directions are numbered in the batch, -1 is no direction
+UP, DOWN, LEFT, RIGHT = range(4)
+DIRECTIONS = (settings.MOVE_UP, settings.MOVE_DOWN, settings.MOVE_LEFT, settings.MOVE_RIGHT)
+REVERSE = numpy.array([DOWN, UP, RIGHT, LEFT, -1], dtype=numpy.int8)  # Indexed by direction, -1 is the last
+
+# Game end reasons
+ALIVE, BORDER, BODY, WIN = range(4)
+
+
+class BatchResult(namedtuple('BatchResult', 'ate done reason score length moves')):
+    """
+    Outcome of one batch step, arrays of batch size
+
+    ate and done are boolean masks, reason is ALIVE/BORDER/BODY/WIN;
+    score, length and moves are taken before finished games are reset.
+    Without auto reset finished games aren't stepped and stay done
+    with their reason until reset.
+    """
+    __slots__ = ()
+
+
+class BatchEngine(object):
+    """
+    Steps n games in lockstep
+
+    Arenas are kept as one (n, height, width) array of block codes, snake's
+    bodies as ring buffers of block indexes with pending growth counters.
+    """
+    def __init__(self, n, width, height, auto_reset=True, seed=None):
+        """Create n fresh games of given arena size"""
+        min_size = 3
+        if width < min_size or height < min_size:
+            raise TooSmallScreen('Small arena size.')
+        self.n = n
+        self.width = width
+        self.height = height
+        self.area = width * height
+        self.auto_reset = auto_reset
+        self.random = numpy.random.RandomState(seed)
+        self.rows = numpy.arange(n)
+
+        # Index offsets of directions, the last one is for no direction
+        self.offsets = numpy.array([-width, width, -1, 1, 0], dtype=numpy.int32)
+
+        self.grids = numpy.zeros((n, height, width), dtype=numpy.uint8)
+        self.flat = self.grids.reshape(n, self.area)  # View of grids with block indexes
+        self.body = numpy.zeros((n, self.area), dtype=numpy.int32)  # Ring buffers of snakes' blocks
+        self.head_pos = numpy.zeros(n, dtype=numpy.int32)  # Head position in ring buffer
+        self.tail_pos = numpy.zeros(n, dtype=numpy.int32)  # Tail position in ring buffer
+        self.length = numpy.zeros(n, dtype=numpy.int32)  # Blocks of snake on arena
+        self.grow = numpy.zeros(n, dtype=numpy.int32)  # Pending growth
+        self.direction = numpy.zeros(n, dtype=numpy.int8)
+        self.prev_direction = numpy.zeros(n, dtype=numpy.int8)
+        self.moves_all = numpy.zeros(n, dtype=numpy.int64)
+        self.moves_from_eat = numpy.zeros(n, dtype=numpy.int64)
+        self.eat_count = numpy.zeros(n, dtype=numpy.int64)
+        self.free_count = numpy.zeros(n, dtype=numpy.int64)  # Empty blocks
+        self.food_count = numpy.zeros(n, dtype=numpy.int64)
+        self.reason = numpy.zeros(n, dtype=numpy.int8)  # Game end reason, ALIVE while playing
+        self.reset()
+
+    @property
+    def snake_length(self):
+        """Snake lengths counting pending growth like Arena.snake_length"""
+        return self.length + self.grow
+
+    @property
+    def heads(self):
+        return self.body[self.rows, self.head_pos]
+
+    def reset(self, envs=None):
+        """Start new games in given arenas (all by default)"""
+        if envs is None:
+            envs = self.rows
+        width, height = self.width, self.height
+        grids = self.grids
+        grids[envs] = CODE_EFIR
+        grids[envs, 0, :] = CODE_BORDER
+        grids[envs, height - 1, :] = CODE_BORDER
+        grids[envs, :, 0] = CODE_BORDER
+        grids[envs, :, width - 1] = CODE_BORDER
+        head = (height // 2) * width + width // 2
+        self.flat[envs, head] = CODE_SNAKE
+        self.body[envs, 0] = head
+        self.head_pos[envs] = 0
+        self.tail_pos[envs] = 0
+        self.length[envs] = 1
+        self.grow[envs] = 0
+        self.direction[envs] = -1
+        self.prev_direction[envs] = -1
+        self.moves_all[envs] = 0
+        self.moves_from_eat[envs] = 0
+        self.eat_count[envs] = 0
+        self.free_count[envs] = (width - 2) * (height - 2) - 1
+        self.food_count[envs] = 0
+        self.reason[envs] = ALIVE
+
+    def place_food(self, envs):
+        """Put food into a random empty block of given arenas"""
+        envs = envs[self.free_count[envs] > 0]
+        if not len(envs):
+            return
+        noise = self.random.random_sample((len(envs), self.area))
+        noise[self.flat[envs] != CODE_EFIR] = -1
+        blocks = noise.argmax(axis=1)
+        self.flat[envs, blocks] = CODE_FOOD
+        self.free_count[envs] -= 1
+        self.food_count[envs] += 1
+
+    def step(self, actions=None):
+        """
+        Make one tick in every arena,
+        actions are directions numbers (UP, DOWN, LEFT, RIGHT) or -1 to keep the current one
+        """
+        live = numpy.flatnonzero(self.reason == ALIVE)  # Finished games stay as they ended until reset
+        flat = self.flat
+        capacity = self.area
+
+        # Prevent misdirection
+        direction = self.direction[live]
+        if actions is not None:
+            actions = numpy.asarray(actions, dtype=numpy.int8)[live]
+            direction = numpy.where(actions >= 0, actions, direction)
+        prev_direction = self.prev_direction[live]
+        misdirection = (self.snake_length[live] > 1) & (direction >= 0) & (REVERSE[direction] == prev_direction)
+        direction = numpy.where(misdirection, prev_direction, direction)
+        self.prev_direction[live] = direction
+
+        # Move head
+        head_pos = self.head_pos[live]
+        new_head = self.body[live, head_pos] + self.offsets[direction]
+
+        # Erase tail unless snake grows
+        growing = self.grow[live] > 0
+        moving, grown = live[~growing], live[growing]
+        tails = self.body[moving, self.tail_pos[moving]]
+        flat[moving, tails] = CODE_EFIR
+        self.free_count[moving] += 1
+        self.tail_pos[moving] = (self.tail_pos[moving] + 1) % capacity
+        self.grow[grown] -= 1
+        self.length[grown] += 1
+
+        # Set new head
+        head_pos = (head_pos + 1) % capacity
+        self.head_pos[live] = head_pos
+        self.body[live, head_pos] = new_head
+        under_head = flat[live, new_head]
+        flat[live, new_head] = CODE_SNAKE
+        self.free_count[live] -= under_head == CODE_EFIR
+        self.food_count[live] -= under_head == CODE_FOOD
+
+        self.moves_all[live] += 1
+        self.moves_from_eat[live] += 1
+
+        # Checking gaming rules
+        direction[direction < 0] = RIGHT
+        self.direction[live] = direction
+
+        win = (self.free_count[live] == 0) & (self.food_count[live] == 0)
+        playing = ~win
+        ate = numpy.zeros(self.n, dtype=bool)
+        ate[live] = playing & (under_head == CODE_FOOD)
+        self.grow[ate] += 3
+        self.moves_from_eat[ate] = 0
+        self.eat_count[ate] += 1
+        self.place_food(live[playing & (self.moves_all[live] == 1)])
+        self.place_food(numpy.flatnonzero(ate))
+
+        reason = numpy.full(len(live), ALIVE, dtype=numpy.int8)
+        reason[playing & (under_head == CODE_BORDER)] = BORDER
+        reason[playing & (under_head == CODE_SNAKE)] = BODY
+        reason[win] = WIN
+        self.reason[live] = reason
+        reason = self.reason.copy()
+        done = reason != ALIVE
+
+        result = BatchResult(ate, done, reason, self.eat_count * 10, self.snake_length, self.moves_all.copy())
+        if self.auto_reset and done.any():
+            self.reset(numpy.flatnonzero(done))
+        return result
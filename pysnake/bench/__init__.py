@@ -0,0 +1,90 @@
+"""
+Benchmarks of the engine and renderer hot paths
+
+A benchmark is a function taking its parameter (arena size or zoom) and
+returning setup and run callables and the number of operations one run
+makes. setup() builds a fresh state outside of timing, run(state) is timed
+and may return a dict of counters (e.g. curses calls). Results are the
+best of several runs per operation, so they can be compared to a baseline.
+"""
+
+import json
+import platform
+
+from ..profiler import perf_counter
+
+
+def measure(benchmark, param, repeat=5):
+    """Time the benchmark with the parameter, returns {'time': seconds per op, counter: per op}"""
+    best = None
+    counters = {}
+    for _ in range(repeat):
+        setup, run, ops = benchmark(param)
+        state = setup()
+        start = perf_counter()
+        counters = run(state) or {}
+        elapsed = perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    result = dict((name, value / float(ops)) for name, value in counters.items())
+    result['time'] = best / ops
+    return result
+
+
+def param_key(param):
+    """JSON key of the benchmark parameter"""
+    if isinstance(param, tuple):
+        return 'x'.join(str(value) for value in param)
+    return str(param)
+
+
+def run(benchmarks, repeat=5, names=None, report=None):
+    """
+    Run [(benchmark, params)], returns {benchmark name: {param key: result}}
+
+    names limits benchmarks to the ones with any of the substrings in name,
+    report(name, key, result) is called after every measurement.
+    """
+    results = {}
+    for benchmark, params in benchmarks:
+        name = benchmark.__name__
+        if names and not any(part in name for part in names):
+            continue
+        results[name] = {}
+        for param in params:
+            key = param_key(param)
+            results[name][key] = measure(benchmark, param, repeat)
+            if report is not None:
+                report(name, key, results[name][key])
+    return results
+
+
+def compare(results, baseline, threshold=0.2):
+    """
+    Compare results with baseline ones,
+    returns [(name, param key, time ratio)] of the ones slower than 1 + threshold
+    """
+    regressions = []
+    for name, params in sorted(results.items()):
+        for key, result in sorted(params.items()):
+            base = baseline.get(name, {}).get(key)
+            if not base or not base['time']:
+                continue
+            ratio = result['time'] / base['time']
+            if ratio > 1 + threshold:
+                regressions.append((name, key, ratio))
+    return regressions
+
+
+def save(path, results):
+    with open(path, 'w') as f:
+        json.dump({
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'results': results,
+        }, f, indent=2, sort_keys=True)
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)['results']
@@ -0,0 +1,53 @@
+import argparse
+import sys
+
+from . import arena, render, run, compare, save, load
+from ..tournament import parse_size
+
+
+def report(name, key, result):
+    extra = ''.join(' %s=%.1f' % (counter, value) for counter, value in sorted(result.items()) if counter != 'time')
+    print('%-16s %12s %12.2f us%s' % (name, key, result['time'] * 1e6, extra))
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='pysnake-bench', description='Benchmark engine and renderer hot paths')
+    parser.add_argument('-s', '--size', action='append', dest='sizes', type=parse_size, metavar='WxH',
+                        help='arena size (default: %s)' % ', '.join('%dx%d' % size for size in arena.SIZES))
+    parser.add_argument('-z', '--zoom', action='append', dest='zooms', type=int, metavar='LEVEL',
+                        help='zoom level of rendering (default: %s)' % ', '.join(map(str, render.ZOOMS)))
+    parser.add_argument('-k', '--select', action='append', metavar='NAME',
+                        help='run only benchmarks with the substring in name')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='runs of every benchmark, the best one counts')
+    parser.add_argument('-o', '--output', metavar='FILE', help='save results as JSON')
+    parser.add_argument('-b', '--baseline', metavar='FILE', help='compare with results saved before')
+    parser.add_argument('-t', '--threshold', type=float, default=0.2,
+                        help='slowdown against baseline reported as regression (default: 0.2, i.e. 20%%)')
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline is not None:
+        try:
+            baseline = load(args.baseline)
+        except (IOError, ValueError, KeyError) as e:
+            parser.error('%s: %s' % (args.baseline, e))
+
+    sizes = args.sizes or arena.SIZES
+    zooms = args.zooms or render.ZOOMS
+    benchmarks = [(benchmark, sizes) for benchmark in arena.BENCHMARKS]
+    benchmarks += [(benchmark, zooms) for benchmark in render.BENCHMARKS]
+    results = run(benchmarks, args.repeat, args.select, report)
+
+    if args.output is not None:
+        save(args.output, results)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        for name, key, ratio in regressions:
+            print('REGRESSION %-16s %12s x%.2f' % (name, key, ratio))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
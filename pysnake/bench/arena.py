@@ -0,0 +1,126 @@
+"""
+Arena benchmarks, parametrized by arena size (width, height)
+"""
+
+import pickle
+import random
+
+from ..arena import Arena, BlockSnake
+from ..multi import MultiArena
+from .. import settings
+
+SIZES = ((20, 10), (80, 25), (200, 60), (500, 150), (1000, 300))
+
+SNAKE_LENGTH = 20
+
+
+def loop(width, height):
+    """Directions of a square loop around the arena's center, the snake returns where it started"""
+    side = max(1, min(width, height) // 4)
+    return ([settings.MOVE_RIGHT] * side + [settings.MOVE_DOWN] * side +
+            [settings.MOVE_LEFT] * side + [settings.MOVE_UP] * side)
+
+
+def playing_arena(width, height):
+    """Arena with a snake moving along the loop and some food"""
+    arena = Arena(width, height, track_touched=False, seed=0)
+    arena.snake_grow(SNAKE_LENGTH - 1)
+    for direction in loop(width, height):
+        arena.direction = direction
+        arena.snake_go()
+    arena.new_food(10)
+    return arena
+
+
+def arena_init(size):
+    width, height = size
+    ops = max(1, 300000 // (width * height))
+
+    def run(state):
+        for _ in range(ops):
+            Arena(width, height)
+    return lambda: None, run, ops
+
+
+def snake_go(size):
+    width, height = size
+    directions = loop(width, height) * max(1, 1000 // len(loop(width, height)))
+
+    def run(arena):
+        for direction in directions:
+            arena.direction = direction
+            arena.snake_go()
+    return lambda: playing_arena(width, height), run, len(directions)
+
+
+def new_food(size):
+    width, height = size
+    ops = min(1000, (width - 2) * (height - 2) // 2)
+
+    def run(arena):
+        arena.new_food(ops)
+    return lambda: Arena(width, height, track_touched=False, seed=0), run, ops
+
+
+def get_blocks(size):
+    width, height = size
+
+    def run(arena):
+        for _ in arena.get_blocks([BlockSnake]):
+            pass
+    return lambda: playing_arena(width, height), run, 1
+
+
+def snake_grow(size):
+    width, height = size
+    ops = 100
+
+    def run(arena):
+        for _ in range(ops):
+            arena.snake_grow()
+    return lambda: playing_arena(width, height), run, ops
+
+
+def pickle_snapshot(size):
+    width, height = size
+
+    def run(arena):
+        pickle.dumps(arena, pickle.HIGHEST_PROTOCOL)
+    return lambda: playing_arena(width, height), run, 1
+
+
+def pickle_restore(size):
+    width, height = size
+
+    def run(data):
+        pickle.loads(data)
+    return lambda: pickle.dumps(playing_arena(width, height), pickle.HIGHEST_PROTOCOL), run, 1
+
+
+def multi_step(size):
+    """Ticks of a shared arena with a snake per 1000 blocks (up to 1000 snakes) turning at random"""
+    width, height = size
+    ops = 20
+    directions = (settings.MOVE_UP, settings.MOVE_DOWN, settings.MOVE_LEFT, settings.MOVE_RIGHT)
+
+    def setup():
+        arena = MultiArena(width, height, track_touched=False, seed=0)
+        for _ in range(max(1, min(1000, width * height // 1000))):
+            arena.add_snake()
+        return arena, random.Random(0)
+
+    def run(state):
+        arena, rnd = state
+        for _ in range(ops):
+            for snake in list(arena.snakes.values()):
+                if not snake.alive:
+                    arena.remove_snake(snake)
+                    arena.add_snake()
+                elif snake.direction is None or rnd.random() < 0.1:
+                    arena.turn(snake, rnd.choice(directions))
+            arena.step()
+    return setup, run, ops
+
+
+BENCHMARKS = (arena_init, snake_go, new_food, get_blocks, snake_grow, pickle_snapshot, pickle_restore,
+              multi_step)
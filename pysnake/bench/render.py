@@ -0,0 +1,95 @@
+"""
+Rendering benchmarks, parametrized by zoom level
+"""
+
+import os
+
+from ..engine import Engine
+from ..game import Game, Zoom
+from ..render import ArenaRenderer, AnsiBackend, NullBackend
+from .arena import loop
+
+ZOOMS = (1, 2, 3, 4)
+
+# Screen the arena is fitted to
+SCREEN_WIDTH = 200
+SCREEN_HEIGHT = 60
+
+
+def fake_game(level, backend=None):
+    """Game with the zoom level drawing with the backend (null one by default), without curses initialization"""
+    zoom = Zoom().in_(level - 1)
+    game = Game.__new__(Game)
+    game.zoom = zoom
+    game.backend = backend or NullBackend()
+    game.engine = Engine(SCREEN_WIDTH // zoom.x, SCREEN_HEIGHT // zoom.y, track_touched=True, seed=0)
+    game.renderer = ArenaRenderer(game.backend, zoom, (SCREEN_WIDTH, SCREEN_HEIGHT))
+    return game
+
+
+def counters(game, calls, chars):
+    return {'calls': game.backend.calls - calls, 'chars': game.backend.chars - chars}
+
+
+def render_full(level):
+    """Full frame, as after start or resize"""
+    def setup():
+        game = fake_game(level)
+        game.engine.step(None)
+        return game
+
+    def run(game):
+        game.render_arena()
+        return counters(game, 0, 0)
+    return setup, run, 1
+
+
+def render_step(level):
+    """Frames of a playing game, one tick each"""
+    ops = 200
+
+    def setup():
+        game = fake_game(level)
+        game.arena.snake_grow(min(19, len(loop(game.arena.width, game.arena.height)) - 2))
+        game.render_arena()
+        return game
+
+    def run(game):
+        arena = game.arena
+        calls, chars = game.backend.calls, game.backend.chars
+        directions = loop(arena.width, arena.height)
+        for tick in range(ops):
+            arena.direction = directions[tick % len(directions)]
+            arena.snake_go()
+            game.render_arena()
+        return counters(game, calls, chars)
+    return setup, run, ops
+
+
+def render_ansi(level):
+    """Frames of a playing game written as ANSI sequences to /dev/null, one tick each"""
+    ops = 200
+
+    def setup():
+        game = fake_game(level, AnsiBackend(os.open(os.devnull, os.O_WRONLY)))
+        game.arena.snake_grow(min(19, len(loop(game.arena.width, game.arena.height)) - 2))
+        game.render_arena()
+        game.backend.flush()
+        return game
+
+    def run(game):
+        arena, backend = game.arena, game.backend
+        written, writes = backend.written, 0
+        directions = loop(arena.width, arena.height)
+        for tick in range(ops):
+            arena.direction = directions[tick % len(directions)]
+            arena.snake_go()
+            game.render_arena()
+            backend.flush()
+            writes += backend.writes
+        os.close(backend.fd)
+        return {'bytes': backend.written - written, 'writes': writes}
+    return setup, run, ops
+
+
+BENCHMARKS = (render_full, render_step, render_ansi)
@@ -0,0 +1,161 @@
+"""
+Session recording in asciicast v2 format
+
+The renderer reports every string it draws, a frame's strings become one
+output event of ANSI escape sequences, so only the changed cells are
+recorded. Events are written by a background thread through a bounded
+queue: when the queue is full the frame is merged into the next one
+instead of blocking the game loop, and a resize waits as the latest size
+(the screen is redrawn after it, so the output before it is dropped). A sink that fails, e.g. a closed pipe
+of a live tail, ends the recording, the game goes on without it. Play
+recordings with ``asciinema play``.
+"""
+
+import threading
+import json
+import gzip
+import time
+
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue
+
+from .clock import monotonic
+from .render import ANSI_COLORS
+
+CLOSE = object()  # Writer thread stop marker
+
+
+class CastRecorder(object):
+    """
+    Records screen output to asciicast v2 file
+
+    sink is a file path (gzip-compressed if it ends with .gz or gzip is set)
+    or a binary file-like object, e.g. a pipe or a socket's makefile('wb'),
+    to tail a live game.
+    """
+    def __init__(self, sink, width, height, gzip_level=None, queue_size=256, title='PySnake'):
+        if not hasattr(sink, 'write'):
+            if gzip_level is None and sink.endswith('.gz'):
+                gzip_level = 6
+            sink = open(sink, 'wb')
+            self.owned = True  # Closed with the recorder
+        else:
+            self.owned = False
+        self.sink = sink
+        self.file = gzip.GzipFile(fileobj=sink, mode='wb', compresslevel=gzip_level) if gzip_level else sink
+        self.start = monotonic()
+        self.chunks = []  # ANSI output of the current frame
+        self.pending = ''  # Output of the frames the queue had no room for
+        self.size = None  # Resize the queue had no room for, goes before the pending output
+        self.dropped = 0  # Events replaced by later ones, the queue had no room for them
+        self.error = None  # Write error that ended the recording, later events are dropped
+        self.queue = queue.Queue(queue_size)
+
+        self.write_line({
+            'version': 2, 'width': width, 'height': height,
+            'timestamp': int(time.time()), 'title': title,
+            'env': {'TERM': 'xterm-256color'},
+        })
+        self.thread = threading.Thread(target=self.writer, name='cast-writer')
+        self.thread.daemon = True
+        self.thread.start()
+        self.chunks.append('\x1b[?25l\x1b[2J')  # Hide cursor, clear screen
+
+    def write_line(self, value):
+        self.file.write(json.dumps(value).encode('utf-8') + b'\n')
+
+    def writer(self):
+        """Writer thread, flushes whenever the queue is drained, after a write error only drains it"""
+        while True:
+            item = self.queue.get()
+            while item is not CLOSE:
+                self.guard(self.write_line, item)
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            self.guard(self.file.flush)
+            if item is CLOSE:
+                return
+
+    def guard(self, write, *args):
+        """Call the write unless the recording has ended, a failing write ends it"""
+        if self.error is None:
+            try:
+                write(*args)
+            except (IOError, OSError, ValueError) as e:  # ValueError: the sink was closed
+                self.error = e
+
+    def put(self, kind, data):
+        """Queue the event without waiting, events the queue has no room for go with the next ones"""
+        if self.error is not None:
+            self.pending = ''
+            self.size = None
+            return
+        if kind == 'o':
+            self.pending += data
+        else:  # Resize, only the latest size matters
+            if not self.flush_pending() and self.pending:
+                self.pending = ''  # The resized screen is redrawn
+                self.dropped += 1
+            if self.size is not None:
+                self.dropped += 1
+            self.size = data
+        self.flush_pending()
+
+    def flush_pending(self, timeout=None):
+        """Queue the waiting resize and output, returns False if the queue has no room for them"""
+        try:
+            if self.size is not None:
+                self.queue.put([self.time(), 'r', self.size], timeout is not None, timeout)
+                self.size = None
+            if self.pending:
+                self.queue.put([self.time(), 'o', self.pending], timeout is not None, timeout)
+                self.pending = ''
+        except queue.Full:
+            return False
+        return True
+
+    def time(self):
+        return round(monotonic() - self.start, 6)
+
+    def draw(self, y, x, string, color=0):
+        """Draw the string at the screen position in the color pair"""
+        self.chunks.append('\x1b[%d;%dH\x1b[%dm%s' % (y + 1, x + 1, ANSI_COLORS[color % len(ANSI_COLORS)], string))
+
+    def clear(self):
+        """Clear the screen"""
+        self.chunks.append('\x1b[0m\x1b[2J')
+
+    def frame(self):
+        """End of the frame, queue what was drawn"""
+        if self.chunks:
+            self.put('o', ''.join(self.chunks))
+            self.chunks = []
+
+    def resize(self, width, height):
+        self.frame()
+        self.put('r', '%dx%d' % (width, height))
+
+    def close(self, timeout=5.0):
+        """Write all the queued events and stop, gives up on a sink stalled for the timeout in seconds"""
+        self.chunks.append('\x1b[0m\x1b[?25h')
+        self.frame()
+        deadline = monotonic() + timeout
+        if self.error is not None or self.flush_pending(timeout):  # A failed writer drains the queue
+            try:
+                self.queue.put(CLOSE, timeout=max(deadline - monotonic(), 0))
+            except queue.Full:
+                pass
+        self.thread.join(max(deadline - monotonic(), 0))
+        if self.thread.is_alive():
+            self.error = self.error or IOError('Cast sink stalled')
+            return  # The writer is stuck in a write, the sink is left to it
+        if self.file is not self.sink:
+            self.guard(self.file.close)  # Gzip trailer, the sink stays open
+        if self.owned:
+            self.sink.close()
+        else:
+            self.guard(self.sink.flush)
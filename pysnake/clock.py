@@ -0,0 +1,68 @@
+"""
+Game clock
+"""
+
+import select
+import sys
+import time
+
+try:
+    monotonic = time.monotonic
+except AttributeError:  # Python 2
+    monotonic = time.time
+
+
+class GameClock(object):
+    """
+    Fixed timestep clock with drift compensation
+
+    Ticks are scheduled by deadlines, every one period after the previous
+    one, so time spent on the tick itself doesn't stretch the tick period.
+    When the game falls behind, rendering of up to max_skip frames in a row
+    is skipped to keep the simulation rate. If it is still more than
+    max_lag periods behind (e.g. after pause) the schedule restarts from now.
+    While waiting, input on stdin is handled as soon as it arrives.
+    """
+    def __init__(self, period, max_skip=5, max_lag=10):
+        self.period = period  # Seconds per tick
+        self.max_skip = max_skip
+        self.max_lag = max_lag
+        self.skipped = 0  # Frames skipped in a row
+        self.deadline = monotonic() + period
+
+    def reset(self):
+        """Restart the schedule from now"""
+        self.deadline = monotonic() + self.period
+        self.skipped = 0
+
+    def render_due(self):
+        """Should the current frame be rendered or skipped to catch up"""
+        if monotonic() > self.deadline and self.skipped < self.max_skip:
+            self.skipped += 1
+            return False
+        self.skipped = 0
+        return True
+
+    def wait(self, on_input=None):
+        """
+        Sleep until the deadline of the tick, schedule the next one,
+        on_input is called whenever stdin becomes readable meanwhile
+        """
+        now = monotonic()
+        while now < self.deadline:
+            if on_input is None:
+                time.sleep(self.deadline - now)
+            elif readable(sys.stdin, self.deadline - now):
+                on_input()
+            now = monotonic()
+        if now - self.deadline > self.period * self.max_lag:
+            self.deadline = now
+        self.deadline += self.period
+
+
+def readable(fileobj, timeout):
+    """Wait up to timeout seconds for the file to become readable"""
+    try:
+        return bool(select.select([fileobj], [], [], timeout)[0])
+    except (select.error, OSError):  # Interrupted by a signal (Python 2), e.g. terminal resize
+        return True
@@ -0,0 +1,143 @@
+"""
+Headless game engine
+
+Pure Python, it does not import curses, so thousands of games can be
+played unattended (e.g. by bots) at raw CPU speed.
+"""
+
+from collections import namedtuple
+
+from .arena import Arena, BlockFood, BlockBorder, BlockSnake
+from .exeptions import PySnakeException, NoMoreSpace, BorderException, BodyException
+from .rewind import Journal
+from .events import EventBus
+from . import settings
+
+
+class StepResult(namedtuple('StepResult', 'ate error')):
+    """
+    Outcome of one engine step
+
+    ate is True if the snake has eaten on this step,
+    error is the GameOver/GameWin exception that ended the game or None
+    """
+    __slots__ = ()
+
+    @property
+    def done(self):
+        return self.error is not None
+
+
+class Engine(object):
+    """
+    Arena, snake driving, gaming rules and scoring without any front-end
+    """
+    def __init__(self, width, height, track_touched=False, rewind_depth=0,
+                 keyframe_interval=settings.REWIND_KEYFRAME_INTERVAL, seed=None, arena=None, events=None):
+        """
+        Create a new Engine instance with a fresh (or given) arena,
+        rewind_depth is the number of ticks kept for rewind (0 disables it),
+        seed makes the game reproducible, events is the EventBus to emit to
+        """
+        self.arena = arena if arena is not None else Arena(width, height, track_touched, seed)
+        self.journal = Journal(rewind_depth, keyframe_interval) if rewind_depth else None
+        self.recorder = None  # Replay writer, see pysnake.replay
+        self.profiler = None  # Tick profiler, see pysnake.profiler
+        self.events = events if events is not None else EventBus()
+        self.over = None  # StepResult that ended the game, the arena isn't stepped after it
+
+    @property
+    def score(self):
+        return self.arena.eat_count * 10
+
+    def step(self, direction=None):
+        """Make one game tick in given direction (None keeps the current one), a finished game returns its end"""
+        if self.over is not None:
+            return self.over  # The head is past the border or in the body, moving it on breaks the arena
+        arena = self.arena
+        if self.recorder is not None:
+            self.recorder.on_step(self, direction)
+        journal = self.journal
+        if journal is not None:
+            journal.begin(arena)
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.mark('snapshot')
+
+        if direction is not None:
+            arena.direction = direction
+
+        # Moving snake
+        arena.snake_go()
+        events = self.events
+        for handler in events.on_move:
+            handler(arena.snake_body[-1], arena.direction)
+        if profiler is not None:
+            profiler.mark('snake_go')
+
+        # Checking gaming rules
+        try:
+            result = StepResult(self.rules(), None)
+        except PySnakeException as e:
+            result = self.over = StepResult(False, e)
+            for handler in events.on_death:
+                handler(e, self.score)
+        for handler in events.on_tick:
+            handler(arena.moves_all, result)
+        if profiler is not None:
+            profiler.mark('rules')
+
+        if journal is not None:
+            journal.commit(arena)
+            if profiler is not None:
+                profiler.mark('snapshot')
+        return result
+
+    def rewind(self, steps=1):
+        """Undo up to given number of ticks, returns the number of undone ticks"""
+        if self.journal is None:
+            return 0
+        self.arena, steps = self.journal.rewind(self.arena, steps)
+        if steps:
+            self.over = None
+        if steps and self.recorder is not None:
+            self.recorder.on_rewind(self)
+        if steps:
+            self.events.emit('on_rewind', steps)
+        return steps
+
+    def rewind_depth(self):
+        """Number of ticks available for rewind"""
+        return len(self.journal) if self.journal is not None else 0
+
+    def rules(self):
+        """Check gaming rules, returns True if snake has eaten"""
+        arena = self.arena
+        block_under_head = arena.block_under_head
+        arena.direction = arena.direction or settings.MOVE_RIGHT
+
+        if not arena.has_space():
+            raise NoMoreSpace
+
+        if arena.moves_all == 1:
+            self.new_food()
+
+        ate = block_under_head == BlockFood
+        if ate:
+            arena.snake_eat(3)
+            for handler in self.events.on_eat:
+                handler(arena.snake_body[-1], arena.eat_count)
+            self.new_food()
+
+        if block_under_head == BlockBorder:
+            raise BorderException('Hit the border!')
+
+        if block_under_head == BlockSnake:
+            raise BodyException('Eat youself!')
+
+        return ate
+
+    def new_food(self):
+        """Put food into the arena"""
+        for index in self.arena.new_food():
+            self.events.emit('on_food_spawn', index)
@@ -0,0 +1,165 @@
+"""
+Gym-style environment for bots training
+"""
+
+import random
+
+from .arena import CODE_BORDER
+from .engine import Engine
+from .exeptions import GameWin
+from . import settings
+
+try:
+    import numpy
+except ImportError:  # NumPy is optional, without it observations are memoryviews
+    numpy = None
+
+
+def grid_view(arena):
+    """Read-only view of the arena grid: NumPy (height, width) array or memoryview"""
+    if numpy is not None:
+        view = arena.view()
+        view.flags.writeable = False
+        return view
+    view = memoryview(arena.grid)
+    return view.toreadonly() if hasattr(view, 'toreadonly') else view
+
+
+class Encoder(object):
+    """
+    Base class for observation encoders
+
+    Encoders are updated incrementally with indexes of the blocks
+    touched by every step. Subclasses define:
+
+        reset(arena)             encode the whole arena
+        update(arena, touched)   encode touched blocks (None if all the blocks are touched)
+        observe(arena)           current observation
+    """
+    def __init__(self):
+        if numpy is None:
+            raise ImportError('Observation encoders require NumPy')
+
+
+class OneHotEncoder(Encoder):
+    """(4, height, width) stack of channels, one per block kind code"""
+    channels = 4
+
+    def reset(self, arena):
+        self.planes = numpy.zeros((self.channels, arena.height, arena.width), dtype=numpy.uint8)
+        self.flat = self.planes.reshape(self.channels, -1)
+        self.grid = arena.view().reshape(-1)
+        for code in range(self.channels):
+            self.planes[code] = arena.view() == code
+        self.observation = self.planes.view()
+        self.observation.flags.writeable = False
+
+    def update(self, arena, touched):
+        if touched is None:
+            return self.reset(arena)
+        if touched:
+            indexes = numpy.fromiter(set(touched), dtype=numpy.intp)
+            self.flat[:, indexes] = 0
+            self.flat[self.grid[indexes], indexes] = 1
+
+    def observe(self, arena):
+        return self.observation
+
+
+class EgoEncoder(Encoder):
+    """
+    (2 * radius + 1) square crop of the grid centered on snake's head,
+    blocks out of the arena are border
+    """
+    def __init__(self, radius=5):
+        super(EgoEncoder, self).__init__()
+        self.radius = radius
+
+    def reset(self, arena):
+        radius = self.radius
+        # Copy of the grid padded with border, crops are views of it
+        self.padded = numpy.full((arena.height + 2 * radius, arena.width + 2 * radius),
+                                 CODE_BORDER, dtype=numpy.uint8)
+        self.padded[radius:radius + arena.height, radius:radius + arena.width] = arena.view()
+        self.grid = arena.view().reshape(-1)
+
+    def update(self, arena, touched):
+        if touched is None:
+            return self.reset(arena)
+        radius, width = self.radius, arena.width
+        for index in set(touched):
+            y, x = divmod(index, width)
+            self.padded[y + radius, x + radius] = self.grid[index]
+
+    def observe(self, arena):
+        head = arena.snake_head
+        size = 2 * self.radius + 1
+        crop = self.padded[head.y:head.y + size, head.x:head.x + size]
+        crop.flags.writeable = False
+        return crop
+
+
+class SnakeEnv(object):
+    """
+    Gym-style environment over the headless engine
+
+    Actions are indexes of actions tuple (None keeps the current direction).
+    Observation is a read-only view of the arena grid, or the encoder's one.
+    """
+    actions = (settings.MOVE_UP, settings.MOVE_DOWN, settings.MOVE_LEFT, settings.MOVE_RIGHT)
+
+    def __init__(self, width, height, seed=None, encoder=None,
+                 eat_reward=1.0, death_reward=-1.0, win_reward=1.0, step_reward=0.0):
+        self.width = width
+        self.height = height
+        self.random = random.Random(seed)  # Seeds of games
+        self.encoder = encoder
+        self.eat_reward = eat_reward
+        self.death_reward = death_reward
+        self.win_reward = win_reward
+        self.step_reward = step_reward
+        self.engine = None
+        self.grid = None
+        self.eat_count = 0
+
+    @property
+    def arena(self):
+        return self.engine.arena
+
+    def observe(self):
+        if self.encoder is not None:
+            return self.encoder.observe(self.arena)
+        return self.grid
+
+    def reset(self):
+        """Start a new game, returns the first observation"""
+        self.engine = Engine(self.width, self.height, track_touched=True, seed=self.random.getrandbits(32))
+        arena = self.engine.arena
+        arena.pop_touched()
+        self.grid = grid_view(arena)
+        if self.encoder is not None:
+            self.encoder.reset(arena)
+        self.eat_count = 0
+        return self.observe()
+
+    def step(self, action):
+        """Make one tick, returns observation, reward, done and info dict"""
+        direction = None if action is None else self.actions[action]
+        result = self.engine.step(direction)
+        arena = self.arena
+        touched = arena.pop_touched()
+        if self.encoder is not None:
+            self.encoder.update(arena, touched)
+
+        reward = self.step_reward + self.eat_reward * (arena.eat_count - self.eat_count)
+        self.eat_count = arena.eat_count
+        if result.error is not None:
+            reward += self.win_reward if isinstance(result.error, GameWin) else self.death_reward
+
+        info = {
+            'score': self.engine.score,
+            'length': arena.snake_length,
+            'moves': arena.moves_all,
+            'error': result.error,
+        }
+        return self.observe(), reward, result.done, info
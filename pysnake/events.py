@@ -0,0 +1,103 @@
+"""
+Game events for plugins
+
+The engine and the game front-end emit events with plain values, so
+subscribers don't depend on the engine's internals:
+
+    on_tick        tick (moves made), StepResult
+    on_move        head grid index, direction key code
+    on_eat         head grid index, eat count
+    on_food_spawn  food grid index
+    on_death       the GameOver/GameWin exception that ended the game, score
+    on_rewind      number of undone ticks
+    on_resize      screen width, height
+
+Subscribers of an event are compiled into a tuple kept as the bus's
+attribute of the event's name, emitters loop over it in place, so an event
+nobody listens to costs one attribute lookup. Batched subscribers are
+called by a worker thread with the list of the event's argument tuples
+since the last call, for consumers too slow for the game loop.
+"""
+
+from collections import deque
+import threading
+
+EVENTS = ('on_tick', 'on_move', 'on_eat', 'on_food_spawn', 'on_death', 'on_rewind', 'on_resize')
+
+
+class EventBus(object):
+    """
+    Subscribers of the game events, see EVENTS
+
+    bus.on_eat etc. are the dispatch tuples, emit with
+    ``for handler in bus.on_eat: handler(head, eat_count)``.
+    """
+    def __init__(self, interval=0.1):
+        self.handlers = dict((event, []) for event in EVENTS)  # Event -> callbacks called in place
+        self.batched = dict((event, []) for event in EVENTS)  # Event -> callbacks called by the worker
+        self.queue = deque()  # (event, args) waiting for the worker
+        self.interval = interval  # Seconds between the worker's deliveries
+        self.worker = None
+        self.stopping = threading.Event()
+        for event in EVENTS:
+            setattr(self, event, ())
+
+    def subscribe(self, event, callback, batched=False):
+        """Call back on the event, batched callbacks get [args] from the worker thread"""
+        if event not in EVENTS:
+            raise ValueError('Unknown event %r' % event)
+        if batched:
+            self.batched[event].append(callback)
+            self.start()
+        else:
+            self.handlers[event].append(callback)
+        self.compile(event)
+
+    def unsubscribe(self, event, callback):
+        for callbacks in (self.handlers[event], self.batched[event]):
+            if callback in callbacks:
+                callbacks.remove(callback)
+        self.compile(event)
+
+    def compile(self, event):
+        """Rebuild the event's dispatch tuple"""
+        handlers = list(self.handlers[event])
+        if self.batched[event]:
+            append = self.queue.append
+            handlers.append(lambda *args: append((event, args)))
+        setattr(self, event, tuple(handlers))
+
+    def emit(self, event, *args):
+        """Emit the event, for the rare ones, hot paths loop over the dispatch tuple in place"""
+        for handler in getattr(self, event):
+            handler(*args)
+
+    def start(self):
+        if self.worker is None:
+            self.worker = threading.Thread(target=self.work, name='event-worker')
+            self.worker.daemon = True
+            self.worker.start()
+
+    def work(self):
+        """Worker thread, delivers the queued events every interval"""
+        while not self.stopping.wait(self.interval):
+            self.deliver()
+        self.deliver()
+
+    def deliver(self):
+        """Call batched subscribers with the events queued so far"""
+        queue, batches = self.queue, {}
+        while queue:
+            event, args = queue.popleft()
+            batches.setdefault(event, []).append(args)
+        for event, batch in batches.items():
+            for callback in tuple(self.batched[event]):
+                callback(batch)
+
+    def close(self):
+        """Deliver the queued events and stop the worker"""
+        if self.worker is not None:
+            self.stopping.set()
+            self.worker.join()
+            self.worker = None
+            self.stopping.clear()
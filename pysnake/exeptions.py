@@ -30,3 +30,11 @@ class BodyException(GameOver):
 
 class NoMoreSpace(GameWin):
     pass
+
+
+class FileFormatError(PySnakeException):
+    pass
+
+
+class ConnectionLost(PySnakeException):
+    pass
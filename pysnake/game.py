@@ -1,12 +1,20 @@
 import sys
 import time
 import curses
-import pickle
-from collections import deque
 import copy
+import select
+from collections import deque
 
-from .arena import Arena, BlockEfir, BlockSnake, BlockFood, BlockBorder
-from . import settings, windows
+from .engine import Engine
+from .replay import ReplayWriter
+from .render import ArenaRenderer, CursesBackend, AnsiBackend, NullBackend
+from .clock import GameClock
+from .profiler import TickProfiler, Samples
+from .autopilot import Autopilot
+from .net import RemoteArena, DIRECTION_CODES, RESPAWN
+from .sparse import new_arena
+from .scores import sqlite3
+from . import settings, windows, state
 from .exeptions import *
 
 
@@ -46,11 +54,8 @@ class Zoom(object):
 
 
 class Game(object):
-    def __init__(self, stdscr, zoom=None):
-        # Rewind feature data structure
-        global snapshots
-        snapshots = deque(maxlen=11)
-
+    def __init__(self, stdscr, zoom=None, record=None, profiler=None, cast=None, arena=None,
+                 save=settings.SAVE_FILE, size=None, backend='curses', scores=None, events=None):
         # Curses settings
         self.adjust_curses()
 
@@ -64,29 +69,86 @@ class Game(object):
         if self.zoom is None:
             self.zoom = Zoom().auto(self.screen_x, self.screen_y)
 
-        # Set arena window
-        self.arena_height, self.arena_width = self.screen_y - 2, self.screen_x - 2
-        # Note here self.arena_height + 1, without " + 1" occures exception while printing last char in bottom right,
-        # because after that cursor moves to the new line of window, so we need one more line to place the cursor.
-        self.arena_win = self.stdscr.subwin(self.arena_height + 1, self.arena_width, 1, 1)
-        self.arena_win = windows.WinKeysWrapper(self.arena_win)
+        # Set windows
+        self.cast = cast  # Session recorder
+        self.arena_win = None
+        self.layout()
         # Key bindings
         self.arena_win.bind(settings.KEYS_EXIT, self.game_quit)
         keys_move = (settings.MOVE_UP, settings.MOVE_DOWN, settings.MOVE_LEFT, settings.MOVE_RIGHT)
         self.arena_win.bind(keys_move, self.change_direction)
         self.arena_win.bind(settings.KEYS_NEW_GAME, lambda: self.new(self.zoom))
         self.arena_win.bind(settings.KEYS_PAUSE, self.game_pause)
-        self.arena_win.bind(curses.KEY_RESIZE, self.new)
+        self.arena_win.bind(curses.KEY_RESIZE, self.resize)
         self.arena_win.bind(settings.KEYS_ZOOM_IN, self.try_zoom_in)
-        self.arena_win.bind(settings.KEYS_ZOOM_OUT, lambda: self.new(self.zoom.out()))
-        self.arena_win.bind(settings.KEYS_AUTO_ZOOM, self.new)
+        self.arena_win.bind(settings.KEYS_ZOOM_OUT, lambda: self.set_zoom(copy.copy(self.zoom).out()))
+        self.arena_win.bind(settings.KEYS_AUTO_ZOOM, lambda: self.set_zoom(Zoom().auto(self.screen_x, self.screen_y)))
         self.arena_win.bind(settings.KEYS_REWIND, self.game_rewind)
+        self.arena_win.bind(settings.KEYS_PROFILER, self.toggle_profiler)
+        self.arena_win.bind(settings.KEYS_AUTOPILOT, self.toggle_autopilot)
+        self.arena_win.bind(settings.KEYS_SAVE, self.game_save)
+        self.arena_win.bind(settings.KEYS_SCORES, self.game_scores)
 
-        # Set bottom menu window
-        self.bottom_win = self.stdscr.subwin(1, self.arena_width, self.arena_height + 1, 1)
-        attr = curses.has_colors() and curses.color_pair(2)
-        self.bottom_win.attrset(attr)
-        menu_str = '%s: Quit, %s: New Game, %s: Pause, %s/%s/%s: Zoom in/out/auto, %s: Rewind' % (
+        # Build game engine with arena of the screen size or the given one,
+        # an arena of another size is centered or scrolled with the snake
+        zoomed_width = int(self.arena_width // self.zoom.x)
+        zoomed_height = int(self.arena_height // self.zoom.y)
+        self.size = size
+        if arena is None and size is not None:
+            arena = new_arena(size[0], size[1])
+        self.engine = Engine(zoomed_width, zoomed_height, track_touched=True, rewind_depth=settings.REWIND_DEPTH,
+                             arena=arena, events=events)
+        self.events = self.engine.events  # Stays the same for the new games
+        self.save_path = save
+        self.has_colors = curses.has_colors()
+
+        # Arena and stats are drawn by the backend, menu and popups by curses
+        self.backend_name = backend
+        if backend == 'ansi':
+            sys.stdout.flush()
+            self.backend = AnsiBackend(sys.stdout.fileno())
+        elif backend == 'null':
+            self.backend = NullBackend()
+        else:
+            self.backend = CursesBackend(self.stdscr, self.color_attr, curses.A_BOLD)
+        self.renderer = ArenaRenderer(self.backend, self.zoom, (self.arena_width, self.arena_height), origin=(1, 1))
+        self.renderer.recorder = cast
+
+        # Record game to replay file
+        if record is not None:
+            ReplayWriter(record, self.engine)
+
+        # Some initials, a resumed game goes on at its speed
+        self.init_loop_delay = settings.INIT_DELAY * 0.95 ** self.arena.eat_count
+        self.loop_delay = self.init_loop_delay
+        self.time_loop = 0  # For performance testing
+        self.clock = GameClock(self.loop_delay)
+
+        # Tick profiler, given one records all the time, otherwise only while shown
+        self.persistent_profiler = profiler
+        self.profiler = profiler
+        self.engine.profiler = profiler
+        self.show_profiler = False
+        self.hud = ''  # Profiler summary on the stats line
+        self.hud_time = 0
+        self.autopilot = None  # Steers the snake when on
+        self.key_code = None
+        self.directions = deque()  # Directions for the next steps, one per tick
+
+        # Finished games go to the scores database with tick times of the last ticks
+        self.scores = scores
+        self.started = time.time()
+        self.recorded = False  # Game is in the scores, rewinding it doesn't record it again
+        self.tick_times = Samples(1000)
+
+    @property
+    def arena(self):
+        return self.engine.arena
+
+    @staticmethod
+    def menu():
+        """Bottom menu string"""
+        return '%s: Quit, %s: New Game, %s: Pause, %s/%s/%s: Zoom in/out/auto, %s: Rewind, %s: Autopilot, %s: Save, %s: Scores, %s: Info' % (
             settings.KEYS_EXIT[0],
             settings.KEYS_NEW_GAME[0],
             settings.KEYS_PAUSE[0],
@@ -94,52 +156,164 @@ class Game(object):
             settings.KEYS_ZOOM_OUT[0],
             settings.KEYS_AUTO_ZOOM[0],
             settings.KEYS_REWIND[0],
+            settings.KEYS_AUTOPILOT[0],
+            settings.KEYS_SAVE[0],
+            settings.KEYS_SCORES[0],
+            settings.KEYS_PROFILER[0],
         )
-        self.bottom_win.addnstr(menu_str, self.arena_width - 1)
-        self.bottom_win.noutrefresh()
 
-        # Set top stats window
-        self.top_win = self.stdscr.subwin(1, self.arena_width, 0, 1)
-        attr = curses.A_BOLD | (curses.has_colors() and curses.color_pair(3))
-        self.top_win.attrset(attr)
+    def game_save(self):
+        """Save the game to resume it later with --resume"""
+        if self.arena.sparse:
+            message = 'Huge arenas are not saved\npress any key'
+        else:
+            try:
+                state.save(self.arena, self.save_path)
+                message = 'Saved to %s\npress any key' % self.save_path
+            except (IOError, OSError) as e:
+                message = 'Not saved: %s\npress any key' % (e.strerror or e)
+        windows.GamePausePopup(self.arena_win, message=message).show()
+        self.repaint()
+        self.clock.reset()
+
+    def game_scores(self):
+        """Leaderboard of the stored games"""
+        if self.scores is None:
+            message = 'Scores are not kept\npress any key'
+        else:
+            lines = []
+            try:
+                totals = self.scores.totals().values()
+                games = sum(total[0] for total in totals)
+                lines.append('Games: %d | Best: %04d | Average: %04d' % (
+                    games, max([total[2] for total in totals] or [0]),
+                    sum(total[1] for total in totals) // max(games, 1)))
+                for place, (score, length, moves, cause, ended) in enumerate(self.scores.top(settings.SCORES_TOP)):
+                    lines.append('%2d. %04d  length %4d  moves %6d  %-11s %s' % (
+                        place + 1, score, length, moves, cause.replace('Exception', ''),
+                        time.strftime('%Y-%m-%d %H:%M', time.localtime(ended))))
+            except sqlite3.Error as e:
+                lines.append('Scores are not available: %s' % e)
+            if self.scores.error is not None:
+                lines.append('Last scores not saved: %s' % self.scores.error)
+            lines.append('press any key')
+            message = '\n'.join(lines)
+        windows.GamePausePopup(self.arena_win, message=message).show()
+        self.repaint()
+        self.clock.reset()
+
+    def record_score(self, error=None):
+        """Queue the game to the scores database once, error is the game's end, none if the game is left"""
+        if self.scores is None or self.recorded:
+            return  # A rewound game keeps its first end
+        arena = self.arena
+        ticks = self.tick_times.summary()
+        self.scores.add(dict(
+            started=self.started, ended=time.time(), width=arena.width, height=arena.height,
+            score=arena.eat_count * 10, length=arena.snake_length, moves=arena.moves_all,
+            cause=type(error).__name__ if error is not None else 'Quit', ticks=ticks['count'],
+            tick_mean=ticks['mean'], tick_p50=ticks['p50'], tick_p95=ticks['p95'], tick_p99=ticks['p99'],
+            tick_max=ticks['max'],
+        ))
+        self.recorded = True
 
-        # Build arena
-        zoomed_width = int(self.arena_width // self.zoom.x)
-        zoomed_height = int(self.arena_height // self.zoom.y)
-        self.arena = Arena(zoomed_width, zoomed_height)
+    def game_rewind(self):
+        if self.engine.rewind():
+            self.render()
+        message = "Rewind mode (%s)\npress 'r'" % self.engine.rewind_depth()
+        windows.GameRewindPopup(self.arena_win, message=message).show()
+        self.repaint()
+        self.clock.reset()
+
+    def repaint(self):
+        """Repaint arena under a closed popup"""
+        self.arena_win.touchwin()
+        self.arena_win.noutrefresh()
+        self.renderer.invalidate()  # Backends drawing past curses lost the blocks too
 
-        # Some initials
-        self.init_loop_delay = settings.INIT_DELAY
-        self.loop_delay = self.init_loop_delay
-        self.time_loop = 0  # For performance testing
-        self.key_code = None
+    def layout(self):
+        """Set windows for the screen size"""
+        self.arena_height, self.arena_width = self.screen_y - 2, self.screen_x - 2
+        # Note here self.arena_height + 1, without " + 1" occures exception while printing last char in bottom right,
+        # because after that cursor moves to the new line of window, so we need one more line to place the cursor.
+        arena_win = self.stdscr.subwin(self.arena_height + 1, self.arena_width, 1, 1)
+        if self.arena_win is None:
+            self.arena_win = windows.WinKeysWrapper(arena_win)
+        else:
+            self.arena_win.wrap(arena_win)  # Keep key bindings
 
-    def add_snapshot(self):
-        snapshots.append(pickle.dumps(self.arena))
+        # Set bottom menu window
+        self.bottom_win = self.stdscr.subwin(1, self.arena_width, self.arena_height + 1, 1)
+        attr = curses.has_colors() and curses.color_pair(2)
+        self.bottom_win.attrset(attr)
+        self.bottom_win.addnstr(self.menu(), self.arena_width - 1)
+        self.bottom_win.noutrefresh()
+        self.record_layout()
 
-    def get_snapshot(self):
-        return pickle.loads(snapshots.pop())
+    def record_layout(self):
+        """Redraw the screen in the session recording"""
+        if self.cast is not None:
+            self.cast.clear()
+            self.cast.draw(self.arena_height + 1, 1, self.menu()[:self.arena_width - 1], 2)
 
-    def game_rewind(self):
-        try:
-            self.arena = self.get_snapshot()
-        except IndexError:
-            # No rewinds
-            pass
-        else:
-            self.arena.refresh()
-            self.render()
-        windows.GameRewindPopup(self.arena_win, message="Rewind mode (%s)\npress 'r'" % len(snapshots)).show()
+    def resize(self):
+        """Fit windows to the new screen size, the game goes on"""
+        self.screen_y, self.screen_x = self.stdscr.getmaxyx()
+        self.check_size(self.screen_x, self.screen_y)
+        self.stdscr.clear()
+        self.stdscr.noutrefresh()
+        if self.cast is not None:
+            self.cast.resize(self.screen_x, self.screen_y)
+        self.layout()
+        self.renderer.reshape(size=(self.arena_width, self.arena_height), origin=(1, 1))
+        self.events.emit('on_resize', self.screen_x, self.screen_y)
+        self.render()
+
+    def set_zoom(self, zoom):
+        """Show the arena with another zoom"""
+        self.zoom = zoom
+        blank = ' ' * self.arena_width
+        for y in range(self.arena_height):
+            self.backend.draw(y + 1, 1, blank)
+        self.record_layout()
+        self.renderer.reshape(zoom=zoom)
+        self.render()
 
     def try_zoom_in(self):
-        prev_zoom = copy.copy(self.zoom)
-        try:
-            self.new(self.zoom.in_())
-        except TooSmallScreen:
-            self.new(prev_zoom)
+        zoom = copy.copy(self.zoom).in_()
+        # Zoom in as long as the arena's minimal size fits the window
+        if self.arena_width // zoom.x >= 3 and self.arena_height // zoom.y >= 3:
+            self.set_zoom(zoom)
+
+    def toggle_profiler(self):
+        self.show_profiler = not self.show_profiler
+        if self.show_profiler and self.profiler is None:
+            self.profiler = TickProfiler()
+        elif not self.show_profiler:
+            self.profiler = self.persistent_profiler
+        self.engine.profiler = self.profiler
+        self.hud_time = 0
+
+    def toggle_autopilot(self):
+        # The autopilot's distance field takes the whole area, no autopilot on huge arenas
+        if self.autopilot is None and not self.arena.sparse:
+            self.autopilot = Autopilot()
+        else:
+            self.autopilot = None
 
     def change_direction(self):
-        self.arena.direction = self.key_code
+        """Queue the direction, so quick turns are taken on the following ticks"""
+        directions = self.directions
+        if len(directions) < settings.DIRECTION_QUEUE and (not directions or directions[-1] != self.key_code):
+            directions.append(self.key_code)
+
+    def read_keys(self):
+        """Handle all the keys pressed so far"""
+        while True:
+            self.key_code = self.arena_win.getch()
+            if self.key_code == -1:
+                return
+            self.arena_win.handle_key(self.key_code)
 
     @staticmethod
     def check_size(width, height):
@@ -169,66 +343,85 @@ class Game(object):
         """ Game mainloop """
         while True:
             t1 = time.time()
-
-            # Take snapshot for rewind
-            self.add_snapshot()
+            if self.profiler is not None:
+                self.profiler.start()
 
             # Catch the input and handle it
-            self.key_code = self.arena_win.getch()
-            self.arena_win.handle_key(self.key_code)
+            self.read_keys()
+            direction = self.directions.popleft() if self.directions else None
 
-            # Moving snake
-            self.arena.snake_go()
+            # Autopilot steers unless a direction key is pressed
+            if self.autopilot is not None and direction is None:
+                direction = self.autopilot.decide(self.arena)
+            if self.profiler is not None:
+                self.profiler.mark('input')
 
-            # Render screen
-            self.render()
+            # Moving snake and checking gaming rules
+            result = self.engine.step(direction)
+
+            # Render screen, unless catching up with the clock
+            rendered = result.done or self.clock.render_due()
+            if rendered:
+                self.render()
+            if self.profiler is not None:
+                self.profiler.mark('render')
+
+            self.tick_times.add(time.time() - t1)
 
-            # Checking gaming rules
+            # Applying step result
             try:
-                self.rules()
+                self.rules(result)
             except GameOver:
                 self.game_over()
             except GameWin:
                 self.game_win()
 
+            if self.profiler is not None:
+                self.profiler.mark('rules')
+
             # Detecting timings
             self.time_loop = time.time() - t1
 
-            # Game delay or game speed
-            time.sleep(self.loop_delay)
+            # Game delay or game speed, keys are handled as soon as pressed
+            self.clock.period = self.loop_delay
+            self.clock.wait(self.read_keys)
+            if self.profiler is not None:
+                self.profiler.mark('sleep')
+                if rendered:
+                    self.profiler.end(self.renderer.cells, self.renderer.calls + 1)  # + stats line
+                else:
+                    self.profiler.end()
 
     def new(self, *args):
         """ Start new game """
+        self.close()
         self.stdscr.clear()
         self.stdscr.noutrefresh()
-        self.__init__(self.stdscr, *args)
-
-    def rules(self):
-        arena = self.arena
-        block_under_head = arena.block_under_head
+        self.__init__(self.stdscr, *args, profiler=self.persistent_profiler, cast=self.cast, save=self.save_path,
+                      size=self.size, backend=self.backend_name, scores=self.scores,
+                      events=self.events)
+
+    def close(self):
+        """ Finish game recording """
+        if self.scores is not None and not self.recorded and self.arena.moves_all:
+            self.record_score()  # Left unfinished
+        if self.engine.recorder is not None:
+            self.engine.recorder.close()
+
+    def rules(self, result):
+        """Adjust game speed by engine step result, reraise game end"""
         min_speed = 0.1
-        arena.direction = arena.direction or settings.MOVE_RIGHT
 
-        if not any(arena.get_blocks([BlockEfir, BlockFood])):
-            raise NoMoreSpace
+        if result.error is not None:
+            self.record_score(result.error)
+            raise result.error
 
         self.loop_delay *= 0.99
 
-        if arena.moves_all == 1:
-            arena.new_food()
-
-        if block_under_head == BlockFood:
-            arena.snake_eat(3)
-            arena.new_food()
+        if result.ate:
             self.init_loop_delay *= 0.95
             self.loop_delay = self.init_loop_delay
 
-        if block_under_head == BlockBorder:
-            raise BorderException('Hit the border!')
-
-        if block_under_head == BlockSnake:
-            raise BodyException('Eat youself!')
-
         if self.loop_delay < min_speed:
             self.loop_delay = min_speed
 
@@ -236,11 +429,15 @@ class Game(object):
         """ Game win screen """
         curses.flash()
         windows.GameWinPopup(self.arena_win).show()
+        self.repaint()
+        self.clock.reset()
 
     def game_over(self):
         """ Game over screen """
         curses.flash()
         windows.GameOverPopup(self.arena_win).show()
+        self.repaint()
+        self.clock.reset()
 
     def game_quit(self):
         """ Quit game """
@@ -251,29 +448,191 @@ class Game(object):
 
     def game_pause(self):
         windows.GamePausePopup(self.arena_win).show()
+        self.repaint()
+        self.clock.reset()
 
     def render(self):
         """ Render game """
+        if self.stdscr.getmaxyx() != (self.screen_y, self.screen_x):
+            return self.resize()  # KEY_RESIZE isn't read yet
         self.render_arena()
         self.render_stats()
-        curses.doupdate()
+        curses.doupdate()  # Menu and popups first, a backend writing past curses draws over them
+        self.backend.flush()
+        if self.cast is not None:
+            self.cast.frame()
 
     def render_arena(self):
         """ Render arena """
-        for block in self.arena:
-            for i in range(self.zoom.y):
-                for j in range(self.zoom.x):
-                    y = block.y * self.zoom.y + i
-                    x = block.x * self.zoom.x + j
-                    self.arena_win.addstr(y, x, str(block))
-                    self.arena_win.chgat(y, x, 1, block.curses_attr)
-        self.arena_win.noutrefresh()
+        self.renderer.render(self.arena)
+
+    def color_attr(self, color):
+        """Curses attributes of the block color"""
+        if color and self.has_colors:
+            return curses.color_pair(color)
+        return 0
 
     def render_stats(self):
         """ Render stats """
         stats_str = 'Score: %04d | Speed: %03d'
         max_chars = self.arena_width - 1
         stats_str = stats_str % (self.arena.eat_count * 10, 1 / self.loop_delay)
+        if self.autopilot is not None:
+            stats_str = '%s | Autopilot: %.2f ms' % (stats_str, self.autopilot.time * 1000)
+        if self.show_profiler:
+            # Percentiles are recalculated once a second
+            now = time.time()
+            if now - self.hud_time > 1:
+                self.hud = self.profiler.hud()
+                self.hud_time = now
+            stats_str = '%s | %s' % (stats_str, self.hud)
+        stats_str = stats_str.rjust(max_chars)
+        self.backend.draw(0, 1, stats_str[:max_chars], 3, bold=True)
+        if self.cast is not None:
+            self.cast.draw(0, 1, stats_str[:max_chars], 3)
+
+
+class ReplayGame(Game):
+    """
+    Replay playback front-end
+    """
+    def __init__(self, stdscr, reader, speed=1.0, start=0, cast=None, backend='curses'):
+        self.reader = reader
+        self.speed = speed
+
+        # The largest zoom the replay's arena fits the screen with, a bigger arena is clipped
+        screen_y, screen_x = stdscr.getmaxyx()
+        max_width, max_height = screen_x - 2, screen_y - 2
+        zoom = Zoom()
+        while True:
+            zoomed = copy.copy(zoom).in_()
+            if reader.width * zoomed.x > max_width or reader.height * zoomed.y > max_height:
+                break
+            zoom = zoomed
+
+        super(ReplayGame, self).__init__(stdscr, zoom, cast=cast, backend=backend)
+        self.ticks = reader.play(start)
+
+        # Playback key bindings, game control keys do nothing
+        idle = lambda: None
+        keys_move = (settings.MOVE_UP, settings.MOVE_DOWN, settings.MOVE_LEFT, settings.MOVE_RIGHT)
+        for keys in (keys_move, settings.KEYS_NEW_GAME, settings.KEYS_AUTO_ZOOM, settings.KEYS_REWIND,
+                     settings.KEYS_PROFILER, settings.KEYS_AUTOPILOT, settings.KEYS_SAVE, settings.KEYS_SCORES):
+            self.arena_win.bind(keys, idle)
+        self.arena_win.bind(settings.KEYS_ZOOM_IN, lambda: self.change_speed(2.0))
+        self.arena_win.bind(settings.KEYS_ZOOM_OUT, lambda: self.change_speed(0.5))
+
+    @staticmethod
+    def menu():
+        """Bottom menu string"""
+        return '%s: Quit, %s: Pause, %s/%s: Speed x2/x0.5' % (
+            settings.KEYS_EXIT[0],
+            settings.KEYS_PAUSE[0],
+            settings.KEYS_ZOOM_IN[0],
+            settings.KEYS_ZOOM_OUT[0],
+        )
+
+    def change_speed(self, factor):
+        self.speed *= factor
+
+    def run(self):
+        """ Playback mainloop """
+        for tick, engine, result in self.ticks:
+            if engine is not self.engine:
+                # Game speed at starting tick
+                self.engine = engine
+                self.init_loop_delay *= 0.95 ** self.arena.eat_count
+                self.loop_delay = self.init_loop_delay
+                self.arena.refresh()
+
+            self.read_keys()
+
+            if result is None or result.done or self.clock.render_due():
+                self.render()
+
+            if result is not None:
+                try:
+                    self.rules(result)
+                except GameOver:
+                    curses.flash()
+                    windows.GameOverPopup(self.arena_win, modal=False).show()
+                except GameWin:
+                    curses.flash()
+                    windows.GameWinPopup(self.arena_win, modal=False).show()
+
+            self.clock.period = self.loop_delay / self.speed
+            self.clock.wait(self.read_keys)
+
+        windows.GamePausePopup(self.arena_win, message='End of replay\npress any key').show()
+
+
+class NetGame(Game):
+    """
+    Multiplayer client front-end, renders the server's arena
+    """
+    def __init__(self, stdscr, connection, cast=None, backend='curses'):
+        self.connection = connection
+        self.remote = RemoteArena(connection.width, connection.height, connection.snake_id)
+        super(NetGame, self).__init__(stdscr, cast=cast, backend=backend)
+        self.was_alive = True
+
+        # Directions go to the server, there is no pause or rewind in a shared game
+        idle = lambda: None
+        keys_move = (settings.MOVE_UP, settings.MOVE_DOWN, settings.MOVE_LEFT, settings.MOVE_RIGHT)
+        self.arena_win.bind(keys_move, lambda: self.connection.send(DIRECTION_CODES[self.key_code]))
+        self.arena_win.bind(settings.KEYS_NEW_GAME, lambda: self.connection.send(RESPAWN))
+        for keys in (settings.KEYS_PAUSE, settings.KEYS_REWIND, settings.KEYS_AUTOPILOT, settings.KEYS_PROFILER,
+                     settings.KEYS_SAVE, settings.KEYS_SCORES):
+            self.arena_win.bind(keys, idle)
+
+    @property
+    def arena(self):
+        return self.remote
+
+    @staticmethod
+    def menu():
+        """Bottom menu string"""
+        return '%s: Quit, %s: Respawn, %s/%s/%s: Zoom in/out/auto' % (
+            settings.KEYS_EXIT[0],
+            settings.KEYS_NEW_GAME[0],
+            settings.KEYS_ZOOM_IN[0],
+            settings.KEYS_ZOOM_OUT[0],
+            settings.KEYS_AUTO_ZOOM[0],
+        )
+
+    def record_score(self, error=None):
+        """Shared games are not kept in the local scores"""
+
+    def close(self):
+        super(NetGame, self).close()
+        self.connection.close()
+
+    def run(self):
+        """ Client mainloop, the server sets the pace """
+        while True:
+            self.read_keys()
+
+            messages = self.connection.receive()
+            for kind, payload in messages:
+                self.remote.apply(kind, payload)
+            if messages:
+                self.render()
+
+            if self.was_alive and not self.remote.alive:
+                curses.flash()
+                windows.GameOverPopup(self.arena_win, message="Game Over\npress '%s'" % settings.KEYS_NEW_GAME[0]).show()
+                self.repaint()
+            self.was_alive = self.remote.alive
+
+            # Wait for the server or a key
+            select.select([self.connection, sys.stdin], [], [], 0.1)
+
+    def render_stats(self):
+        """ Render stats """
+        arena = self.remote
+        stats_str = 'Players: %d | Length: %04d | Tick: %d' % (arena.players, arena.snake_length, arena.tick)
+        max_chars = self.arena_width - 1
         stats_str = stats_str.rjust(max_chars)
-        self.top_win.addnstr(0, 0, stats_str, max_chars)
-        self.top_win.noutrefresh()
+        self.backend.draw(0, 1, stats_str[:max_chars], 3, bold=True)
+        if self.cast is not None:
+            self.cast.draw(0, 1, stats_str[:max_chars], 3)
@@ -0,0 +1,140 @@
+"""
+Arena shared by several snakes
+"""
+
+from collections import deque
+from array import array
+
+from .arena import Arena, CODE_EFIR, CODE_BORDER, CODE_SNAKE, CODE_FOOD
+from .exeptions import NoMoreSpace
+
+COLORS = 6  # Snakes are colored with curses color pairs 1-6
+
+
+class Snake(object):
+    """One of the arena's snakes, its body is a deque of grid indexes with the head at the end"""
+    def __init__(self, id, color):
+        self.id = id
+        self.color = color
+        self.body = deque()
+        self.growth = 0  # Blocks left to grow by
+        self.direction = None
+        self.alive = True
+        self.eat_count = 0
+
+    def __len__(self):
+        return len(self.body) + self.growth
+
+    @property
+    def head(self):
+        return self.body[-1]
+
+
+class MultiArena(Arena):
+    """
+    Arena with any number of snakes
+
+    Snakes join and leave any time, every step moves all the living ones
+    at once. Tails move first, then a snake dies if its head hits the
+    border or a body, heads meeting in one block (food included) kill all
+    but the longest snake there, and two snakes swapping blocks both die.
+    Dead snakes' bodies are removed.
+
+    The owners grid holds the id of the snake in every block (0 if none),
+    so a step costs in the number of snakes, not the arena area.
+    """
+    growth = 3  # Blocks a snake grows by eating
+
+    def init_snake(self):
+        """Snakes are added later"""
+        self.snakes = {}  # id -> Snake
+        self.next_id = 1
+        self.owners = array('i', [0]) * (self.width * self.height)  # Snake id by grid index
+
+    def add_snake(self):
+        """Put a new one block snake into a random empty block"""
+        if not self.free:
+            raise NoMoreSpace('No room for a new snake.')
+        snake = Snake(self.next_id, (self.next_id - 1) % COLORS + 1)
+        self.next_id += 1
+        index = self.free[self.random.randrange(len(self.free))]
+        snake.body.append(index)
+        self.write(index, CODE_SNAKE, snake.color)
+        self.owners[index] = snake.id
+        self.snakes[snake.id] = snake
+        return snake
+
+    def remove_snake(self, snake):
+        self.kill(snake)
+        del self.snakes[snake.id]
+
+    def kill(self, snake):
+        """Remove the snake's body from the arena"""
+        owners = self.owners
+        for index in snake.body:
+            self.write(index, CODE_EFIR)
+            owners[index] = 0
+        snake.body.clear()
+        snake.alive = False
+
+    def turn(self, snake, direction):
+        """Change the snake's direction, unless it's the opposite one"""
+        if len(snake.body) > 1 and self.offsets[direction] == -self.offsets.get(snake.direction, 0):
+            return
+        snake.direction = direction
+
+    def step(self):
+        """Move all the living snakes at once"""
+        grid, owners, offsets = self.grid, self.owners, self.offsets
+        moves = []  # (snake, head, next head)
+        for id in sorted(self.snakes):
+            snake = self.snakes[id]
+            if snake.alive and snake.direction is not None:
+                head = snake.body[-1]
+                moves.append((snake, head, head + offsets[snake.direction]))
+
+        # Tails move first, so a snake can go where a tail was
+        for snake, head, next_head in moves:
+            if snake.growth:
+                snake.growth -= 1
+            else:
+                tail = snake.body.popleft()
+                self.write(tail, CODE_EFIR)
+                owners[tail] = 0
+
+        arrivals = {}  # Next head -> snakes going there
+        departures = {}  # Head -> its move
+        for move in moves:
+            arrivals.setdefault(move[2], []).append(move[0])
+            departures[move[1]] = move
+
+        dead = []
+        for snake, head, next_head in moves:
+            if grid[next_head] == CODE_BORDER or owners[next_head]:
+                dead.append(snake)  # Hit the border or a body
+                continue
+            other = departures.get(next_head)
+            if other is not None and other[2] == head:
+                dead.append(snake)  # Swapped blocks with a one block snake
+                continue
+            rivals = arrivals[next_head]
+            if len(rivals) > 1:
+                length = len(snake)
+                if any(len(rival) >= length for rival in rivals if rival is not snake):
+                    dead.append(snake)  # Head-on, only a strictly longest snake survives
+        for snake in dead:
+            self.kill(snake)
+
+        for snake, head, next_head in moves:
+            if not snake.alive:
+                continue
+            if grid[next_head] == CODE_FOOD:
+                snake.growth += self.growth
+                snake.eat_count += 1
+            snake.body.append(next_head)
+            self.write(next_head, CODE_SNAKE, snake.color)
+            owners[next_head] = snake.id
+
+        # Some food for everybody
+        self.new_food(1 + len(self.snakes) // 4 - self.food_count)
+        self.moves_all += 1
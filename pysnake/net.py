@@ -0,0 +1,223 @@
+"""
+Multiplayer network protocol
+
+Every message is a varint payload length, a message type byte and the
+payload. Blocks are sent as glyphs, block code | color << 2 (the same as
+the renderer's front buffer). The server sends:
+
+    WELCOME   arena width and height, client's snake id (varints)
+    FRAME     tick (varint), zlib-compressed glyphs of all the blocks
+    DELTA     tick, changed blocks count, (index delta, glyph) per block in index order
+    STATUS    snake alive flag, head x, y, length, players count (varints)
+
+and clients send single bytes: direction codes 0-3 or RESPAWN.
+"""
+
+import socket
+import errno
+import zlib
+
+from .arena import BlockSnake
+from .replay import pack_varint, DIRECTIONS
+from .exeptions import FileFormatError, ConnectionLost
+
+MSG_WELCOME = 0
+MSG_FRAME = 1
+MSG_DELTA = 2
+MSG_STATUS = 3
+
+RESPAWN = len(DIRECTIONS)
+
+DIRECTION_CODES = dict((direction, code) for code, direction in enumerate(DIRECTIONS))
+
+
+def read_varint(data, offset):
+    """Decode LEB128 varint from bytearray, returns value and the offset after it"""
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def read_varints(data, count, offset=0):
+    values = []
+    for _ in range(count):
+        value, offset = read_varint(data, offset)
+        values.append(value)
+    return values
+
+
+def message(kind, payload):
+    return pack_varint(len(payload) + 1) + bytes(bytearray([kind])) + bytes(payload)
+
+
+def pack_varints(kind, *values):
+    return message(kind, b''.join(pack_varint(value) for value in values))
+
+
+def glyphs(arena):
+    """Glyphs of all the blocks"""
+    result = bytearray(arena.grid)
+    for index, color in arena.colors.items():
+        result[index] |= color << 2
+    return result
+
+
+def pack_frame(tick, arena):
+    return message(MSG_FRAME, pack_varint(tick) + zlib.compress(bytes(glyphs(arena))))
+
+
+def pack_delta(tick, arena, indexes):
+    """Message with glyphs of the blocks with given sorted indexes"""
+    grid, colors = arena.grid, arena.colors
+    payload = bytearray(pack_varint(tick))
+    payload += pack_varint(len(indexes))
+    prev = 0
+    for index in indexes:
+        payload += pack_varint(index - prev)
+        payload.append(grid[index] | colors.get(index, 0) << 2)
+        prev = index
+    return message(MSG_DELTA, payload)
+
+
+class Decoder(object):
+    """Splits received stream into (message type, payload bytearray)"""
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        """Add received data, returns complete messages"""
+        self.buffer += data
+        buffer, messages, offset = self.buffer, [], 0
+        while offset < len(buffer):
+            try:
+                length, start = read_varint(buffer, offset)
+            except IndexError:
+                break  # Length isn't received completely
+            if start + length > len(buffer):
+                break
+            messages.append((buffer[start], buffer[start + 1:start + length]))
+            offset = start + length
+        del buffer[:offset]
+        return messages
+
+
+class RemoteArena(object):
+    """
+    Client side copy of the server's arena for rendering
+
+    Has the part of Arena interface used by the renderer: grid, colors,
+    touched blocks and the client's snake head.
+    """
+    def __init__(self, width, height, snake_id):
+        self.width = width
+        self.height = height
+        self.snake_id = snake_id
+        self.grid = bytearray(width * height)
+        self.colors = {}
+        self.touched_blocks = []
+        self.touched_all = True
+        self.tick = 0
+        self.alive = True
+        self.snake_head = BlockSnake(width // 2, height // 2)
+        self.snake_length = 1
+        self.players = 1
+
+    def pop_touched(self):
+        """Take indexes of touched blocks (None if all the blocks are touched)"""
+        touched_blocks = None if self.touched_all else self.touched_blocks
+        self.touched_blocks = []
+        self.touched_all = False
+        return touched_blocks
+
+    def refresh(self):
+        self.touched_blocks = []
+        self.touched_all = True
+
+    def set_glyph(self, index, glyph):
+        self.grid[index] = glyph & 3
+        if glyph >> 2:
+            self.colors[index] = glyph >> 2
+        else:
+            self.colors.pop(index, None)
+
+    def apply(self, kind, payload):
+        """Apply a server message"""
+        if kind == MSG_FRAME:
+            self.tick, offset = read_varint(payload, 0)
+            glyphs = bytearray(zlib.decompress(bytes(payload[offset:])))
+            if len(glyphs) != len(self.grid):
+                raise FileFormatError('Frame size mismatch.')
+            self.colors = {}
+            for index, glyph in enumerate(glyphs):
+                if glyph >> 2:
+                    self.colors[index] = glyph >> 2
+                    glyphs[index] = glyph & 3
+            self.grid[:] = glyphs
+            self.refresh()
+        elif kind == MSG_DELTA:
+            self.tick, offset = read_varint(payload, 0)
+            count, offset = read_varint(payload, offset)
+            index = 0
+            for _ in range(count):
+                delta, offset = read_varint(payload, offset)
+                index += delta
+                self.set_glyph(index, payload[offset])
+                offset += 1
+                if not self.touched_all:
+                    self.touched_blocks.append(index)
+        elif kind == MSG_STATUS:
+            alive, x, y, self.snake_length, self.players = read_varints(payload, 5)
+            self.alive = bool(alive)
+            if self.alive:
+                self.snake_head = BlockSnake(x, y)
+
+
+class Connection(object):
+    """Client's connection to the server, non-blocking once welcomed"""
+    def __init__(self, host, port, timeout=5.0):
+        self.socket = socket.create_connection((host, port), timeout)
+        self.decoder = Decoder()
+        self.messages = []  # Received after the welcome
+        while not self.messages:
+            self.messages = self.decoder.feed(self.recv())
+        kind, payload = self.messages.pop(0)
+        if kind != MSG_WELCOME:
+            raise FileFormatError('Not a Snake server.')
+        self.width, self.height, self.snake_id = read_varints(payload, 3)
+        self.socket.setblocking(False)
+
+    def recv(self):
+        data = self.socket.recv(65536)
+        if not data:
+            raise ConnectionLost('Connection closed by the server.')
+        return data
+
+    def send(self, code):
+        """Send direction code or RESPAWN"""
+        try:
+            self.socket.send(bytearray([code]))
+        except socket.error as e:
+            raise ConnectionLost(str(e))
+
+    def receive(self):
+        """Messages received so far"""
+        messages, self.messages = self.messages, []
+        while True:
+            try:
+                data = self.recv()
+            except socket.error as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    return messages
+                raise ConnectionLost(str(e))
+            messages.extend(self.decoder.feed(data))
+
+    def fileno(self):
+        return self.socket.fileno()
+
+    def close(self):
+        self.socket.close()
@@ -0,0 +1,97 @@
+"""
+Tick profiler
+"""
+
+from array import array
+import json
+import time
+
+try:
+    perf_counter = time.perf_counter
+except AttributeError:  # Python 2
+    perf_counter = time.time
+
+
+class Samples(object):
+    """Rolling window of the last samples"""
+    def __init__(self, size):
+        self.values = array('d', [0.0]) * size
+        self.count = 0  # Samples added so far
+
+    def add(self, value):
+        self.values[self.count % len(self.values)] = value
+        self.count += 1
+
+    def summary(self):
+        """Dict with count, mean, p50, p95, p99 and max of the window"""
+        values = sorted(self.values[:min(self.count, len(self.values))])
+        if not values:
+            return dict(count=0, mean=0.0, p50=0.0, p95=0.0, p99=0.0, max=0.0)
+
+        def percentile(p):
+            return values[min(len(values) - 1, int(len(values) * p / 100.0))]
+        return dict(count=self.count, mean=sum(values) / len(values),
+                    p50=percentile(50), p95=percentile(95), p99=percentile(99), max=values[-1])
+
+
+class TickProfiler(object):
+    """
+    Times every phase of the game tick
+
+    The game loop and the engine call mark(phase) when a phase is over,
+    times of the same phase within one tick are summed up. Phase times
+    (in seconds), rendered cells and curses calls per frame are kept in
+    rolling windows for percentiles.
+    """
+    phases = ('snapshot', 'input', 'snake_go', 'render', 'rules', 'sleep')
+    counters = ('cells', 'calls')
+
+    def __init__(self, window=1000):
+        self.samples = dict((name, Samples(window)) for name in self.phases + self.counters)
+        self.current = dict.fromkeys(self.phases, 0.0)
+        self.last = perf_counter()
+
+    def start(self):
+        """Start of the tick"""
+        self.last = perf_counter()
+
+    def mark(self, phase):
+        """Phase is over"""
+        now = perf_counter()
+        self.current[phase] += now - self.last
+        self.last = now
+
+    def end(self, cells=0, calls=0):
+        """End of the tick with the frame's rendered cells and curses calls"""
+        current, samples = self.current, self.samples
+        for phase in self.phases:
+            samples[phase].add(current[phase])
+            current[phase] = 0.0
+        samples['cells'].add(cells)
+        samples['calls'].add(calls)
+
+    def summary(self):
+        """{phase or counter: summary dict}"""
+        return dict((name, samples.summary()) for name, samples in self.samples.items())
+
+    def hud(self):
+        """Short summary for the stats line: p50/p95/p99 of tick phases in ms"""
+        summary = self.summary()
+        parts = []
+        for phase in ('snake_go', 'render', 'rules'):
+            parts.append('%s %.1f/%.1f/%.1f' % (
+                phase, summary[phase]['p50'] * 1000, summary[phase]['p95'] * 1000, summary[phase]['p99'] * 1000))
+        parts.append('cells %d calls %d' % (summary['cells']['p50'], summary['calls']['p50']))
+        return ' | '.join(parts)
+
+    def dump(self, path):
+        """Save summary as CSV (by .csv extension) or JSON"""
+        summary = self.summary()
+        with open(path, 'w') as f:
+            if path.lower().endswith('.csv'):
+                columns = ('count', 'mean', 'p50', 'p95', 'p99', 'max')
+                f.write('name,%s\n' % ','.join(columns))
+                for name in self.phases + self.counters:
+                    f.write('%s,%s\n' % (name, ','.join(repr(summary[name][column]) for column in columns)))
+            else:
+                json.dump(summary, f, indent=2, sort_keys=True)
@@ -0,0 +1,331 @@
+"""
+Arena rendering
+
+ArenaRenderer decides what to draw, a backend draws it: curses windows,
+ANSI escape sequences written straight to the terminal, or nothing at all.
+Backends draw strings at screen positions in color numbers (curses color
+pairs, 0 is the default color) and show the frame on flush().
+"""
+
+import errno
+import select
+import os
+
+from .arena import BLOCKS
+
+UNKNOWN = 0xff  # Glyph of the screen block in unknown state
+
+# ANSI foreground colors of curses color pairs 1-7 (see Game.adjust_curses)
+ANSI_COLORS = (39, 34, 36, 32, 35, 31, 33, 37)
+
+
+class CursesBackend(object):
+    """
+    Draws into curses window (the screen one, so positions are the screen's),
+    color_attr maps color numbers to curses attributes, bold_attr is curses.A_BOLD
+    """
+    def __init__(self, win, color_attr, bold_attr=0):
+        self.win = win
+        self.color_attr = color_attr
+        self.bold_attr = bold_attr
+        self.attrs = {}  # (color, bold) -> attributes
+
+    def draw(self, y, x, string, color=0, bold=False):
+        attr = self.attrs.get((color, bold))
+        if attr is None:
+            attr = self.attrs[color, bold] = self.color_attr(color) | (self.bold_attr if bold else 0)
+        self.win.addstr(y, x, string, attr)
+
+    def flush(self):
+        self.win.refresh()
+
+
+class AnsiBackend(object):
+    """
+    Writes frames to terminal as ANSI escape sequences
+
+    Cursor moves, colors and strings of a frame are put into one buffer,
+    allocated once and grown if needed, and written with a single os.write()
+    (more only on partial writes), so a frame is one packet over SSH. The
+    cursor and attributes are saved and restored around the frame, so that
+    curses drawing the rest of the screen doesn't lose track of them.
+    """
+    def __init__(self, fd, size=64 * 1024):
+        self.fd = fd
+        self.buffer = bytearray(size)
+        self.length = 0  # Bytes of the frame in the buffer
+        self.sgr = None  # (color, bold) of the last string
+        self.writes = 0  # os.write() calls made by the last flush
+        self.written = 0  # Bytes written so far
+
+    def put(self, data):
+        end = self.length + len(data)
+        if end > len(self.buffer):
+            self.buffer.extend(bytearray(max(end, 2 * len(self.buffer)) - len(self.buffer)))
+        self.buffer[self.length:end] = data
+        self.length = end
+
+    def draw(self, y, x, string, color=0, bold=False):
+        if not self.length:
+            self.put(b'\x1b7')  # Save cursor and attributes
+        if (color, bold) != self.sgr:
+            self.sgr = color, bold
+            sgr = '\x1b[0;%s%dm' % ('1;' if bold else '', ANSI_COLORS[color % len(ANSI_COLORS)])
+            self.put(('\x1b[%d;%dH%s%s' % (y + 1, x + 1, sgr, string)).encode('utf-8'))
+        else:
+            self.put(('\x1b[%d;%dH%s' % (y + 1, x + 1, string)).encode('utf-8'))
+
+    def flush(self):
+        """Write the frame"""
+        self.writes = 0
+        if not self.length:
+            return
+        self.put(b'\x1b[0m\x1b8')  # Restore cursor and attributes
+        data = memoryview(self.buffer)[:self.length]
+        while data:
+            try:
+                written = os.write(self.fd, data)
+            except OSError as e:
+                if e.errno not in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    raise
+                select.select([], [self.fd], [])  # Non-blocking terminal is full
+                continue
+            data = data[written:]
+            self.writes += 1
+            self.written += written
+        self.length = 0
+        self.sgr = None
+
+
+class NullBackend(object):
+    """Draws nothing, counts calls and characters, for benchmarks and headless runs"""
+    def __init__(self):
+        self.calls = 0
+        self.chars = 0
+
+    def draw(self, y, x, string, color=0, bold=False):
+        self.calls += 1
+        self.chars += len(string)
+
+    def flush(self):
+        pass
+
+
+class Viewport(object):
+    """
+    Part of the arena shown in the window
+
+    An arena smaller than the window is centered in it, a bigger one is
+    clipped to the window and scrolled to keep the snake's head in view.
+    """
+    margin = 0.25  # Part of the view between the head and the edges before scrolling
+
+    def __init__(self, width, height):
+        self.width = width  # Window size in characters
+        self.height = height
+        self.x = self.y = 0  # Arena block in the top left corner
+        self.columns = self.rows = 0  # Arena blocks shown
+        self.screen_x = self.screen_y = 0  # Position of the top left block in the window
+
+    def fit(self, arena, zoom):
+        """Compute the view of the arena with the zoom"""
+        self.columns = min(arena.width, self.width // zoom.x)
+        self.rows = min(arena.height, self.height // zoom.y)
+        self.screen_x = (self.width - self.columns * zoom.x) // 2
+        self.screen_y = (self.height - self.rows * zoom.y) // 2
+        self.x = max(0, min(self.x, arena.width - self.columns))
+        self.y = max(0, min(self.y, arena.height - self.rows))
+
+    def follow(self, arena):
+        """Scroll to keep the snake's head away from the edges, returns True if scrolled"""
+        head = arena.snake_head
+        x = self.scroll(self.x, self.columns, arena.width, head.x)
+        y = self.scroll(self.y, self.rows, arena.height, head.y)
+        if (x, y) == (self.x, self.y):
+            return False
+        self.x, self.y = x, y
+        return True
+
+    def scroll(self, start, size, total, position):
+        """New start of the view along one axis, centered on the position if it's too close to the edge"""
+        margin = int(size * self.margin)
+        if size >= total or start + margin <= position < start + size - margin:
+            return start
+        return max(0, min(total - size, position - size // 2))
+
+
+class ArenaRenderer(object):
+    """
+    Draws changed arena blocks with zoom
+
+    The renderer keeps a front buffer with glyphs (code | color << 2) of the
+    blocks in the viewport and diffs touched blocks against it, so only
+    blocks that really look different are drawn, however often the arena
+    asks for a full refresh. Changed blocks are coalesced into dirty
+    rectangles and horizontally adjacent blocks looking the same are drawn
+    as one run with a single addstr() per screen row. Every block is zoom.x
+    characters wide and zoom.y rows high. Only the viewport's blocks are
+    ever read, so the cost is bounded by the window size, not the arena's.
+    """
+    def __init__(self, backend, zoom, size, origin=(0, 0)):
+        """
+        Create renderer drawing with the backend and zoom,
+        size is (width, height) of the screen part to draw in, origin is its top left (y, x)
+        """
+        self.backend = backend
+        self.zoom = zoom
+        self.origin = origin
+        self.glyphs = {}  # glyph -> zoomed block string
+        self.front = bytearray()  # Empty until the first frame
+        self.invalidate()
+        self.viewport = Viewport(*size)
+        self.fitted = None  # Arena size the viewport is fitted for
+        self.cells = 0  # Blocks drawn by the last render
+        self.calls = 0  # Curses calls made by the last render
+        self.recorder = None  # Gets the drawn strings too, see pysnake.cast
+
+    def invalidate(self):
+        """Forget the screen state, the next frame is drawn completely"""
+        self.front = bytearray()
+
+    def reshape(self, zoom=None, size=None, origin=None):
+        """Change zoom, (width, height) or origin to draw in, the next frame is drawn completely"""
+        if zoom is not None:
+            self.zoom = zoom
+            self.glyphs = {}
+        if size is not None:
+            self.viewport.width, self.viewport.height = size
+        if origin is not None:
+            self.origin = origin
+        self.fitted = None
+        self.invalidate()
+
+    def glyph(self, glyph):
+        """Zoomed string of the glyph"""
+        if glyph not in self.glyphs:
+            self.glyphs[glyph] = BLOCKS[glyph & 3].kind * self.zoom.x
+        return self.glyphs[glyph]
+
+    def diff(self, arena):
+        """Update the front buffer with touched blocks, returns sorted front buffer indexes of changed ones"""
+        viewport = self.viewport
+        left, top, columns, rows = viewport.x, viewport.y, viewport.columns, viewport.rows
+        touched = arena.pop_touched()
+        grid, colors, width = arena.grid, arena.colors, arena.width
+        area = columns * rows
+        if len(self.front) != area:
+            self.front = bytearray([UNKNOWN]) * area
+            touched = None
+        front = self.front
+
+        if touched is not None:
+            changed = []
+            for index in set(touched):
+                y, x = divmod(index, width)
+                x -= left
+                y -= top
+                if 0 <= x < columns and 0 <= y < rows:
+                    glyph = grid[index] | colors.get(index, 0) << 2
+                    local = y * columns + x
+                    if front[local] != glyph:
+                        front[local] = glyph
+                        changed.append(local)
+            changed.sort()
+            return changed
+
+        # Full frame of the viewport, compare row by row
+        back = bytearray(area)
+        for row in range(rows):
+            start = (top + row) * width + left
+            back[row * columns:(row + 1) * columns] = grid[start:start + columns]
+        for index, color in colors.items():
+            y, x = divmod(index, width)
+            x -= left
+            y -= top
+            if 0 <= x < columns and 0 <= y < rows:
+                back[y * columns + x] |= color << 2
+        changed = []
+        for start in range(0, area, columns):
+            end = start + columns
+            if front[start:end] != back[start:end]:
+                changed.extend(index for index in range(start, end) if front[index] != back[index])
+        self.front = back
+        return changed
+
+    @staticmethod
+    def rects(changed, width):
+        """Coalesce sorted indexes of changed blocks into dirty rectangles (x, y, width, height)"""
+        # Spans of adjacent blocks in rows
+        spans = []
+        start = prev = -2
+        for index in changed:
+            if index != prev + 1 or index % width == 0:
+                if start >= 0:
+                    spans.append((start, prev))
+                start = index
+            prev = index
+        if start >= 0:
+            spans.append((start, prev))
+
+        # Merge the same spans of adjacent rows
+        rects = []
+        prev_row = row = {}  # (x, width) -> index of rect ending in the previous/current row
+        last_y = None
+        for start, end in spans:
+            y, x = divmod(start, width)
+            if y != last_y:
+                prev_row = row if last_y is not None and y == last_y + 1 else {}
+                row = {}
+                last_y = y
+            key = x, end - start + 1
+            rect = prev_row.get(key)
+            if rect is not None:
+                x, rect_y, rect_width, height = rects[rect]
+                rects[rect] = x, rect_y, rect_width, height + 1
+            else:
+                rect = len(rects)
+                rects.append((x, y, key[1], 1))
+            row[key] = rect
+        return rects
+
+    def runs(self, arena):
+        """Yields (x, y, length, glyph) runs of changed blocks looking the same, in the viewport's blocks"""
+        changed = self.diff(arena)
+        front, width = self.front, self.viewport.columns
+        for rect_x, rect_y, rect_width, rect_height in self.rects(changed, width):
+            for y in range(rect_y, rect_y + rect_height):
+                start = y * width + rect_x
+                end = start + rect_width
+                run_start = start
+                for index in range(start + 1, end + 1):
+                    if index == end or front[index] != front[run_start]:
+                        yield run_start - y * width, y, index - run_start, front[run_start]
+                        run_start = index
+
+    def render(self, arena):
+        """Draw changed blocks of the arena in the viewport"""
+        viewport = self.viewport
+        if self.fitted != (arena.width, arena.height):
+            viewport.fit(arena, self.zoom)
+            self.fitted = arena.width, arena.height
+            self.invalidate()
+        if viewport.follow(arena):
+            self.invalidate()
+
+        zoom_x, zoom_y = self.zoom.x, self.zoom.y
+        draw = self.backend.draw
+        recorder = self.recorder
+        cells = runs = 0
+        for x, y, length, glyph in self.runs(arena):
+            string = self.glyph(glyph) * length
+            color = glyph >> 2
+            screen_x = self.origin[1] + viewport.screen_x + x * zoom_x
+            screen_y = self.origin[0] + viewport.screen_y + y * zoom_y
+            for screen_y in range(screen_y, screen_y + zoom_y):
+                draw(screen_y, screen_x, string, color)
+                if recorder is not None:
+                    recorder.draw(screen_y, screen_x, string, color)
+            cells += length
+            runs += 1
+        self.cells = cells
+        self.calls = runs * zoom_y
@@ -0,0 +1,233 @@
+"""
+Deterministic game replays
+
+Replay file layout (little-endian):
+
+    header    magic 'PSNR', version, arena width and height
+    events    varint ticks since previous event, event code, payload
+    index     varint keyframes count, (varint tick delta, varint offset delta) per keyframe
+    footer    index offset, ticks count, magic 'PSNI'
+
+Event codes 0-3 are direction inputs of the tick, a keyframe event holds
+the zlib-compressed arena state (see pysnake.state) before the tick, a
+rewind event is always followed by a keyframe of the rewound arena.
+Readers memory-map the file and use the keyframe index to seek to any
+tick replaying at most keyframe_interval ticks.
+"""
+
+from bisect import bisect_right
+import struct
+import mmap
+import zlib
+
+from .engine import Engine
+from .exeptions import FileFormatError
+from . import settings, state
+
+MAGIC = b'PSNR'
+INDEX_MAGIC = b'PSNI'
+VERSION = 1
+
+HEADER = struct.Struct('<4sBII')  # magic, version, width, height
+FOOTER = struct.Struct('<QQ4s')  # index offset, ticks count, magic
+BYTE = struct.Struct('<B')
+
+DIRECTIONS = (settings.MOVE_UP, settings.MOVE_DOWN, settings.MOVE_LEFT, settings.MOVE_RIGHT)
+EVENT_KEYFRAME = 4
+EVENT_REWIND = 5
+EVENT_END = 6
+
+
+def pack_varint(value):
+    """Encode non negative integer as LEB128 varint"""
+    result = bytearray()
+    while value > 0x7f:
+        result.append(value & 0x7f | 0x80)
+        value >>= 7
+    result.append(value)
+    return bytes(result)
+
+
+def unpack_varint(data, offset):
+    """Decode LEB128 varint, returns value and the offset after it"""
+    value = shift = 0
+    while True:
+        byte = BYTE.unpack_from(data, offset)[0]
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+class ReplayWriter(object):
+    """
+    Records the engine's inputs to a replay file
+
+    Attaches itself to the engine, which reports every step and rewind.
+    """
+    def __init__(self, file, engine, keyframe_interval=settings.REPLAY_KEYFRAME_INTERVAL):
+        """Start recording to the file path or binary file object"""
+        self.file = file if hasattr(file, 'write') else open(file, 'wb')
+        self.engine = engine
+        self.keyframe_interval = keyframe_interval
+        self.offset = 0  # Current file offset
+        self.tick = 0  # Engine steps recorded
+        self.event_tick = 0  # Tick of the last event
+        self.index = []  # (tick, offset) of keyframes
+
+        self.write(HEADER.pack(MAGIC, VERSION, engine.arena.width, engine.arena.height))
+        self.keyframe()
+        engine.recorder = self
+
+    def write(self, data):
+        self.file.write(data)
+        self.offset += len(data)
+
+    def event(self, code, payload=b''):
+        """Write event of the current tick"""
+        self.write(pack_varint(self.tick - self.event_tick) + BYTE.pack(code) + payload)
+        self.event_tick = self.tick
+
+    def keyframe(self):
+        """Write keyframe of the current engine's arena"""
+        self.index.append((self.tick, self.offset))
+        data = zlib.compress(state.dump(self.engine.arena))
+        self.event(EVENT_KEYFRAME, pack_varint(len(data)) + data)
+
+    def on_step(self, engine, direction):
+        """Engine is about to make a step in given direction"""
+        if self.tick % self.keyframe_interval == 0 and self.index[-1][0] != self.tick:
+            self.keyframe()
+        if direction is not None:
+            self.event(DIRECTIONS.index(direction))
+        self.tick += 1
+
+    def on_rewind(self, engine):
+        """Engine has been rewound"""
+        self.event(EVENT_REWIND)
+        self.keyframe()
+
+    def close(self):
+        """Write the keyframe index and close the file"""
+        self.event(EVENT_END)
+        index_offset = self.offset
+        chunks = [pack_varint(len(self.index))]
+        prev_tick = prev_offset = 0
+        for tick, offset in self.index:
+            chunks.append(pack_varint(tick - prev_tick) + pack_varint(offset - prev_offset))
+            prev_tick, prev_offset = tick, offset
+        self.write(b''.join(chunks))
+        self.write(FOOTER.pack(index_offset, self.tick, INDEX_MAGIC))
+        self.file.close()
+        self.engine.recorder = None
+
+
+class ReplayReader(object):
+    """
+    Lazily reads a replay file
+
+    Only the header and the keyframe index are read upfront,
+    events are decoded from the memory-mapped file on demand.
+    """
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Empty file
+            raise FileFormatError('Not a replay.')
+        if len(self.data) < HEADER.size + FOOTER.size:
+            raise FileFormatError('Not a replay.')
+
+        magic, version, self.width, self.height = HEADER.unpack_from(self.data)
+        if magic != MAGIC:
+            raise FileFormatError('Not a replay.')
+        if version != VERSION:
+            raise FileFormatError('Unsupported replay version %s.' % version)
+
+        index_offset, self.length, magic = FOOTER.unpack_from(self.data, len(self.data) - FOOTER.size)
+        if magic != INDEX_MAGIC:
+            raise FileFormatError('Unfinished replay.')
+
+        count, offset = unpack_varint(self.data, index_offset)
+        self.index_ticks = []
+        self.index_offsets = []
+        tick = event_offset = 0
+        for _ in range(count):
+            tick_delta, offset = unpack_varint(self.data, offset)
+            offset_delta, offset = unpack_varint(self.data, offset)
+            tick += tick_delta
+            event_offset += offset_delta
+            self.index_ticks.append(tick)
+            self.index_offsets.append(event_offset)
+
+    def __len__(self):
+        """Ticks count"""
+        return self.length
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def events(self, offset, tick):
+        """Yields (tick, code, payload) of events starting from the one at given offset and tick"""
+        data = self.data
+        _, offset = unpack_varint(data, offset)  # Tick of the first event is given
+        while True:
+            code = BYTE.unpack_from(data, offset)[0]
+            offset += 1
+            payload = None
+            if code == EVENT_KEYFRAME:
+                size, offset = unpack_varint(data, offset)
+                payload = data[offset:offset + size]
+                offset += size
+            yield tick, code, payload
+            if code == EVENT_END:
+                return
+            delta, offset = unpack_varint(data, offset)
+            tick += delta
+
+    def play(self, start=0):
+        """
+        Yields (tick, engine, result) starting from the state at start tick
+        (result is None for it), then after every engine step and rewind
+        (result is None for the rewound state, yielded with the same tick after the step's one)
+        """
+        start = max(0, min(start, self.length))
+        keyframe = bisect_right(self.index_ticks, start) - 1
+        tick = self.index_ticks[keyframe]
+        engine = None
+        direction = None
+        rewound = False
+        for event_tick, code, payload in self.events(self.index_offsets[keyframe], tick):
+            while tick < event_tick:
+                if tick == start:
+                    yield tick, engine, None
+                result = engine.step(direction)
+                direction = None
+                tick += 1
+                if tick > start:
+                    yield tick, engine, result
+            if code == EVENT_KEYFRAME:
+                if engine is None or rewound:
+                    arena = state.load(zlib.decompress(payload))
+                    if engine is None:
+                        engine = Engine(arena.width, arena.height, arena=arena)
+                    engine.arena = arena
+                    engine.over = None
+                    if rewound and tick > start:
+                        yield tick, engine, None  # The rewound state is the tick's last one, as seek() finds it
+                    rewound = False
+            elif code == EVENT_REWIND:
+                rewound = True
+            elif code == EVENT_END:
+                if tick == start:
+                    yield tick, engine, None
+                return
+            else:
+                direction = DIRECTIONS[code]
+
+    def seek(self, tick):
+        """Engine with the state at given tick, the rewound one if the game was rewound at it"""
+        for _, engine, _ in self.play(tick):
+            return engine
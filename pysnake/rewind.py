@@ -0,0 +1,125 @@
+"""
+Rewind journal
+"""
+
+from collections import deque
+import pickle
+
+from . import settings
+
+
+class Journal(object):
+    """
+    Journal of game ticks for the rewind mode
+
+    Every entry stores only what the tick has changed: overwritten blocks,
+    snake's old tail and length, counters and direction, so memory per tick
+    is constant and undoing a tick is O(1). Arena keyframes taken every
+    keyframe_interval ticks bound the cost of rewinding many ticks at once.
+    A keyframe is O(area): the grid is kept, a byte a block, the free blocks
+    index is left out and rebuilt from the grid when it's restored, so
+    restoring is worth it only to skip at least keyframe_interval ticks.
+    """
+    # Arena attributes restored by undo
+    state_attrs = ('moves_all', 'moves_from_eat', 'eat_count', 'direction', 'prev_direction',
+                   'block_under_head', 'last_tail', 'snake_growth')
+    # Arena attributes left out of keyframes, 8 bytes a block
+    index_attrs = ('free', 'free_pos')
+
+    def __init__(self, depth=settings.REWIND_DEPTH, keyframe_interval=settings.REWIND_KEYFRAME_INTERVAL):
+        self.entries = deque(maxlen=depth)
+        self.keyframe_interval = keyframe_interval
+        self.keyframes = deque()  # (tick, pickled arena) in ascending order
+        self.tick = 0  # Ticks committed so far (less undone ones)
+        self.pending = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def begin(self, arena):
+        """Start journaling of a new tick"""
+        state = tuple(getattr(arena, attr) for attr in self.state_attrs)
+        self.pending = (state, arena.snake_body[0], len(arena.snake_body))
+        arena.changes = []
+
+    def commit(self, arena):
+        """Finish journaling of the tick"""
+        self.entries.append(self.pending + (arena.changes,))
+        self.pending = None
+        arena.changes = None
+        self.tick += 1
+
+        # Forget keyframes out of the journal's reach, take a new one
+        while self.keyframes and self.keyframes[0][0] < self.tick - len(self.entries):
+            self.keyframes.popleft()
+        if self.keyframe_interval and self.tick % self.keyframe_interval == 0:
+            self.keyframes.append((self.tick, self.snapshot(arena)))
+
+    @classmethod
+    def snapshot(cls, arena):
+        """Pickled arena without its free blocks index"""
+        index = [(attr, arena.__dict__.pop(attr)) for attr in cls.index_attrs if attr in arena.__dict__]
+        try:
+            return pickle.dumps(arena, pickle.HIGHEST_PROTOCOL)
+        finally:
+            arena.__dict__.update(index)
+
+    @staticmethod
+    def restore(keyframe):
+        """Arena of the keyframe with the free blocks index rebuilt"""
+        arena = pickle.loads(keyframe)
+        if not arena.sparse:  # Sparse arenas only count free blocks
+            arena.reindex()
+        arena.touched_blocks = []
+        arena.refresh()
+        return arena
+
+    def undo(self, arena):
+        """Undo the last tick in place, returns False if there is nothing to undo"""
+        try:
+            state, tail, length, changes = self.entries.pop()
+        except IndexError:
+            return False
+        self.tick -= 1
+
+        # Restore overwritten blocks
+        for index, code, color in reversed(changes):
+            arena.write(index, code, color)
+
+        # Restore snake's body: drop head, return tail unless the snake grew
+        body = arena.snake_body
+        body.pop()
+        if len(body) < length:
+            body.appendleft(tail)
+
+        for attr, value in zip(self.state_attrs, state):
+            setattr(arena, attr, value)
+
+        while self.keyframes and self.keyframes[-1][0] > self.tick:
+            self.keyframes.pop()
+        return True
+
+    def rewind(self, arena, steps=1):
+        """
+        Undo up to given number of ticks,
+        returns the rewound arena (a new one if it was restored from keyframe)
+        and the number of undone ticks
+        """
+        steps = min(steps, len(self.entries))
+        target = self.tick - steps
+
+        # Jump to the nearest keyframe not older than target, if it skips more undos than it costs
+        for tick, keyframe in self.keyframes:
+            if target <= tick < self.tick:
+                if self.tick - tick >= self.keyframe_interval:
+                    for _ in range(self.tick - tick):
+                        self.entries.pop()
+                    self.tick = tick
+                    arena = self.restore(keyframe)
+                break
+
+        while self.keyframes and self.keyframes[-1][0] > self.tick:
+            self.keyframes.pop()
+        while self.tick > target:
+            self.undo(arena)
+        return arena, steps
@@ -0,0 +1,149 @@
+"""
+High scores and session telemetry in SQLite
+
+Every finished game is a row of the sessions table: score, length, moves,
+what ended it and tick time percentiles. Rows are queued by the game and
+inserted by a background thread, everything queued so far in one
+transaction, so the game loop never waits for the disk. The database is
+in WAL mode, so the leaderboard is read while the writer goes on.
+
+The leaderboard reads the top scores through an index and the totals
+from a table of per-cause aggregates the writer keeps up to date, so
+both stay fast with millions of sessions stored.
+"""
+
+import threading
+
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue
+
+try:
+    import sqlite3
+except ImportError:  # Python built without SQLite, scores are not kept
+    sqlite3 = None
+
+CLOSE = object()  # Writer thread stop marker
+
+COLUMNS = ('started', 'ended', 'width', 'height', 'score', 'length', 'moves', 'cause',
+           'ticks', 'tick_mean', 'tick_p50', 'tick_p95', 'tick_p99', 'tick_max')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    started REAL NOT NULL,
+    ended REAL NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    score INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    moves INTEGER NOT NULL,
+    cause TEXT NOT NULL,
+    ticks INTEGER NOT NULL,
+    tick_mean REAL NOT NULL,
+    tick_p50 REAL NOT NULL,
+    tick_p95 REAL NOT NULL,
+    tick_p99 REAL NOT NULL,
+    tick_max REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_score ON sessions (score DESC);
+CREATE TABLE IF NOT EXISTS totals (
+    cause TEXT PRIMARY KEY,
+    games INTEGER NOT NULL DEFAULT 0,
+    score INTEGER NOT NULL DEFAULT 0,
+    best INTEGER NOT NULL DEFAULT 0,
+    moves INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+INSERT = 'INSERT INTO sessions (%s) VALUES (%s)' % (', '.join(COLUMNS), ', '.join('?' * len(COLUMNS)))
+
+
+def connect(path):
+    db = sqlite3.connect(path, timeout=10)
+    db.execute('PRAGMA journal_mode=WAL')
+    db.execute('PRAGMA synchronous=NORMAL')  # Durable enough with WAL, no fsync per transaction
+    db.executescript(SCHEMA)
+    return db
+
+
+class ScoreStore(object):
+    """
+    Sessions database, add() queues a session, queries read the committed ones
+
+    Queries go through the creating thread's connection, the writer thread
+    has its own.
+    """
+    def __init__(self, path, batch_size=256):
+        if sqlite3 is None:
+            raise ImportError('Scores require sqlite3')
+        self.path = path
+        self.batch_size = batch_size  # Sessions per transaction at most
+        self.db = connect(path)
+        self.error = None  # Last error of the writer, its batch is lost
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.writer, name='scores-writer')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def add(self, session):
+        """Queue the session, a dict of COLUMNS values"""
+        self.queue.put(tuple(session[column] for column in COLUMNS))
+
+    def writer(self):
+        """Writer thread, inserts the queued sessions in batches"""
+        db = connect(self.path)
+        try:
+            while True:
+                batch = [self.queue.get()]
+                while batch[-1] is not CLOSE and len(batch) < self.batch_size:
+                    try:
+                        batch.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+                closing = batch[-1] is CLOSE
+                if closing:
+                    batch.pop()
+                if batch:
+                    try:
+                        self.insert(db, batch)
+                    except sqlite3.Error as e:
+                        self.error = e
+                if closing:
+                    return
+        finally:
+            db.close()
+
+    @staticmethod
+    def insert(db, batch):
+        """Insert sessions and update the totals in one transaction"""
+        totals = {}  # cause -> [games, score, best, moves]
+        cause, score, moves = COLUMNS.index('cause'), COLUMNS.index('score'), COLUMNS.index('moves')
+        for row in batch:
+            total = totals.setdefault(row[cause], [0, 0, 0, 0])
+            total[0] += 1
+            total[1] += row[score]
+            total[2] = max(total[2], row[score])
+            total[3] += row[moves]
+        with db:
+            db.executemany(INSERT, batch)
+            for name, (games, score_sum, best, moves_sum) in totals.items():
+                db.execute('INSERT OR IGNORE INTO totals (cause) VALUES (?)', (name,))
+                db.execute('UPDATE totals SET games = games + ?, score = score + ?, best = MAX(best, ?), '
+                           'moves = moves + ? WHERE cause = ?', (games, score_sum, best, moves_sum, name))
+
+    def top(self, limit=10):
+        """[(score, length, moves, cause, ended)] of the best sessions"""
+        return self.db.execute('SELECT score, length, moves, cause, ended FROM sessions '
+                               'ORDER BY score DESC, id LIMIT ?', (limit,)).fetchall()
+
+    def totals(self):
+        """{cause: (games, score sum, best score, moves sum)}"""
+        return dict((row[0], row[1:]) for row in self.db.execute('SELECT cause, games, score, best, moves FROM totals'))
+
+    def close(self):
+        """Write all the queued sessions and stop"""
+        self.queue.put(CLOSE)
+        self.thread.join()
+        self.db.close()
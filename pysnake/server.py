@@ -0,0 +1,193 @@
+"""
+Multiplayer server
+
+Hosts one MultiArena with a snake per connected client on asyncio.
+Every tick the changed blocks are encoded once and the same delta message
+is written to all the clients (see pysnake.net for the protocol). Writes
+never wait: a client whose send buffer is over the limit skips deltas and
+gets a full frame once the buffer drains, so slow readers can't stall
+the tick loop.
+"""
+
+from collections import deque
+import argparse
+
+from .multi import MultiArena
+from .net import (MSG_WELCOME, MSG_STATUS, RESPAWN, pack_varints, pack_frame, pack_delta)
+from .replay import DIRECTIONS
+from .tournament import parse_size
+from .exeptions import NoMoreSpace
+
+try:
+    import asyncio
+    Protocol = asyncio.Protocol
+except ImportError:  # Python 2, the server requires Python 3
+    asyncio = None
+    Protocol = object
+
+INPUT_QUEUE = 3  # Directions a client can queue, one is taken per tick
+
+
+class ClientProtocol(Protocol):
+    """Connection of one client"""
+    def __init__(self, server):
+        self.server = server
+        self.transport = None
+        self.snake = None
+        self.inputs = deque(maxlen=INPUT_QUEUE)  # Directions for the next ticks
+        self.respawn = False
+        self.paused = False  # Send buffer is over the limit
+        self.resync = False  # Deltas were skipped, a frame is needed
+        self.status = None  # Last status sent
+
+    def connection_made(self, transport):
+        self.transport = transport
+        transport.set_write_buffer_limits(high=self.server.max_buffer)
+        self.server.join(self)
+
+    def data_received(self, data):
+        for code in bytearray(data):
+            if code < RESPAWN:
+                self.inputs.append(DIRECTIONS[code])
+            elif code == RESPAWN:
+                self.respawn = True
+
+    def eof_received(self):
+        return False
+
+    def connection_lost(self, exc):
+        self.server.leave(self)
+
+    def pause_writing(self):
+        self.paused = True
+
+    def resume_writing(self):
+        self.paused = False
+
+
+class Server(object):
+    """Game of the connected clients"""
+    def __init__(self, width, height, tick=0.1, seed=None, max_buffer=64 * 1024):
+        self.arena = MultiArena(width, height, seed=seed)
+        self.arena.pop_touched()
+        self.tick_period = tick
+        self.max_buffer = max_buffer  # Bytes buffered per client before deltas are skipped
+        self.clients = []
+        self.tick = 0
+        self.loop = None
+        self.deadline = None
+
+    def join(self, client):
+        arena = self.arena
+        self.spawn(client)
+        snake_id = client.snake.id if client.snake is not None else 0
+        client.transport.write(pack_varints(MSG_WELCOME, arena.width, arena.height, snake_id))
+        client.transport.write(pack_frame(self.tick, arena))
+        self.clients.append(client)
+
+    def spawn(self, client):
+        try:
+            client.snake = self.arena.add_snake()
+        except NoMoreSpace:
+            client.snake = None
+
+    def leave(self, client):
+        if client in self.clients:
+            self.clients.remove(client)
+        if client.snake is not None:
+            self.arena.remove_snake(client.snake)
+            client.snake = None
+
+    def step(self):
+        """One tick: apply inputs, move snakes and broadcast changes"""
+        arena = self.arena
+        for client in self.clients:
+            snake = client.snake
+            if client.respawn:
+                client.respawn = False
+                if snake is None or not snake.alive:
+                    if snake is not None:
+                        arena.remove_snake(snake)
+                    self.spawn(client)
+            elif client.inputs and snake is not None:
+                arena.turn(snake, client.inputs.popleft())
+        arena.step()
+        self.tick += 1
+
+        touched = arena.pop_touched()
+        if touched is None:
+            delta = pack_frame(self.tick, arena)
+        else:
+            delta = pack_delta(self.tick, arena, sorted(set(touched)))
+        frame = None
+        players = len(arena.snakes)
+        for client in self.clients:
+            transport = client.transport
+            if client.paused:
+                client.resync = True
+                continue
+            if client.resync:
+                if frame is None:
+                    frame = pack_frame(self.tick, arena)
+                transport.write(frame)
+                client.resync = False
+            else:
+                transport.write(delta)
+            self.send_status(client, players)
+
+    def send_status(self, client, players):
+        snake = client.snake
+        if snake is None or not snake.body:
+            status = (0, 0, 0, 0, players)
+        else:
+            y, x = divmod(snake.head, self.arena.width)
+            status = (int(snake.alive), x, y, len(snake), players)
+        if status != client.status:
+            client.transport.write(pack_varints(MSG_STATUS, *status))
+            client.status = status
+
+    def schedule(self):
+        """Tick by deadlines, so the tick's own time doesn't stretch the period"""
+        self.step()
+        now = self.loop.time()
+        self.deadline += self.tick_period
+        if self.deadline < now:
+            self.deadline = now  # Too far behind, don't try to catch up
+        self.loop.call_at(self.deadline, self.schedule)
+
+    def serve(self, host, port):
+        """Run the server forever"""
+        if asyncio is None:
+            raise ImportError('Multiplayer server requires asyncio (Python 3)')
+        self.loop = loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        server = loop.run_until_complete(loop.create_server(lambda: ClientProtocol(self), host, port))
+        self.deadline = loop.time() + self.tick_period
+        loop.call_at(self.deadline, self.schedule)
+        try:
+            loop.run_forever()
+        finally:
+            server.close()
+            loop.run_until_complete(server.wait_closed())
+            loop.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='pysnake-server', description='Multiplayer Snake server')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on (default: 127.0.0.1)')
+    parser.add_argument('-p', '--port', type=int, default=7777, help='port to listen on (default: 7777)')
+    parser.add_argument('-s', '--size', type=parse_size, default=(80, 40), metavar='WxH',
+                        help='arena size (default: 80x40)')
+    parser.add_argument('-t', '--ticks', type=float, default=10, help='ticks per second (default: 10)')
+    parser.add_argument('--seed', type=int, help='food placement seed')
+    args = parser.parse_args()
+
+    server = Server(args.size[0], args.size[1], 1.0 / args.ticks, args.seed)
+    try:
+        server.serve(args.host, args.port)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
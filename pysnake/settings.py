@@ -2,17 +2,29 @@
 Game settings
 """
 
-import curses
+import os
 
 
 # Initial game delay (aka game speed)
 INIT_DELAY = 0.5  # Seconds
 
+# Direction keys pressed ahead, one is taken per tick
+DIRECTION_QUEUE = 3
+
+# Rewind
+REWIND_DEPTH = 5000  # Ticks
+REWIND_KEYFRAME_INTERVAL = 500  # Ticks between arena keyframes
+
+# Replay
+REPLAY_KEYFRAME_INTERVAL = 1000  # Ticks between keyframes of replay file
+
 # Control keys
-MOVE_UP = curses.KEY_UP
-MOVE_DOWN = curses.KEY_DOWN
-MOVE_LEFT = curses.KEY_LEFT
-MOVE_RIGHT = curses.KEY_RIGHT
+# Move keys are the curses key codes, spelled out so that
+# the headless engine does not have to import curses
+MOVE_UP = 259  # curses.KEY_UP
+MOVE_DOWN = 258  # curses.KEY_DOWN
+MOVE_LEFT = 260  # curses.KEY_LEFT
+MOVE_RIGHT = 261  # curses.KEY_RIGHT
 KEYS_EXIT = 'qQ'
 KEYS_NEW_GAME = 'nN'
 KEYS_ZOOM_IN = '+'
@@ -20,6 +32,17 @@ KEYS_ZOOM_OUT = '-'
 KEYS_AUTO_ZOOM = 'aA'
 KEYS_PAUSE = 'pP'
 KEYS_REWIND = 'rR'
+KEYS_PROFILER = 'iI'
+KEYS_AUTOPILOT = 'oO'
+KEYS_SAVE = 'sS'
+KEYS_SCORES = 'lL'
+
+# Save
+SAVE_FILE = 'pysnake.save'  # Default file the game is saved to
+
+# Scores
+SCORES_FILE = os.path.join(os.path.expanduser('~'), '.pysnake.db')  # SQLite database of finished games
+SCORES_TOP = 10  # Sessions shown on the leaderboard
 
 # Graphics
 ARENA_SNAKE = 'O'
@@ -0,0 +1,103 @@
+"""
+Sparse arena for huge sizes
+
+Only non-empty blocks (border, snake, food) are stored, so memory scales
+with the blocks taken rather than the arena area. The renderer draws the
+viewport only, so a 10000x10000 arena costs the same to show as a small one.
+"""
+
+from .arena import Arena, BlockFood, CODE_BORDER
+
+SPARSE_AREA = 10 ** 6  # Arenas bigger than that are sparse by default
+
+
+def new_arena(width, height, track_touched=True, seed=None):
+    """Arena of the size, a sparse one if it's huge"""
+    cls = SparseArena if width * height > SPARSE_AREA else Arena
+    return cls(width, height, track_touched, seed)
+
+
+class SparseGrid(object):
+    """
+    Grid of block codes keeping the non-empty blocks in a dict
+
+    Supports the part of bytearray interface the arena and the renderer
+    use: indexing, row slices and len().
+    """
+    def __init__(self, area):
+        self.area = area
+        self.codes = {}  # Grid index -> block code
+
+    def __len__(self):
+        return self.area
+
+    def __getitem__(self, index):
+        codes = self.codes
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.area)
+            return bytearray(codes.get(index, 0) for index in range(start, stop, step))
+        return codes.get(index, 0)
+
+    def __setitem__(self, index, code):
+        if code:
+            self.codes[index] = code
+        else:
+            self.codes.pop(index, None)
+
+    def count(self, code):
+        return sum(1 for value in self.codes.values() if value == code[0])
+
+
+class SparseArena(Arena):
+    """
+    Arena storing only taken blocks
+
+    Instead of the free blocks index only their number is kept, food is
+    placed into random blocks until an empty one is found, which takes
+    a few tries unless the arena is almost full.
+    """
+    sparse = True
+
+    def __init__(self, width, height, track_touched=True, seed=None):
+        self.init_state(width, height, track_touched, seed)
+        self.grid = SparseGrid(width * height)
+        self.colors = {}
+        self.free_count = (width - 2) * (height - 2)
+        self.set_border()
+        self.food_count = 0
+        self.refresh()
+        self.init_snake()
+
+    def set_border(self):
+        """Draw arena's border"""
+        width, height, grid = self.width, self.height, self.grid
+        for x in range(width):
+            grid[x] = grid[(height - 1) * width + x] = CODE_BORDER
+        for y in range(height):
+            grid[y * width] = grid[y * width + width - 1] = CODE_BORDER
+
+    def free_add(self, index):
+        self.free_count += 1
+
+    def free_remove(self, index):
+        self.free_count -= 1
+
+    def has_space(self):
+        """Is there any empty or food block left"""
+        return self.free_count > 0 or self.food_count > 0
+
+    def new_food(self, num=1):
+        """Generate food in random empty block, returns grid indexes of the food"""
+        grid, random = self.grid, self.random
+        inner_width, inner_height = self.width - 2, self.height - 2
+        placed = []
+        for _ in range(num):
+            if not self.free_count:
+                break
+            while True:
+                x, y = random.randrange(inner_width) + 1, random.randrange(inner_height) + 1
+                if not grid[y * self.width + x]:
+                    break
+            self.set_block(BlockFood(x, y, random.randrange(1, 7)))
+            placed.append(y * self.width + x)
+        return placed
@@ -0,0 +1,201 @@
+"""
+Compact binary arena state
+
+Versioned and pickle-free, so states are safe to share
+and stable across Python versions. The grid and the free blocks index
+are stored raw, so loading a memory-mapped file only copies them.
+"""
+
+from collections import deque
+from operator import itemgetter
+from array import array
+import struct
+import mmap
+import sys
+
+from .arena import Arena, BLOCKS, CODE_EFIR
+from .exeptions import FileFormatError
+from . import settings
+
+MAGIC = b'PSNS'
+VERSION = 2  # Version 2 adds the free blocks positions
+
+# magic, version, width, height, moves_all, moves_from_eat, eat_count, direction, prev_direction,
+# snake length (with growth), snake body blocks count, code of block under head, last tail x and y,
+# food colors count, free blocks count
+HEADER = struct.Struct('<4sBIIIIIiiIIBiiII')
+# random generator version, state and gauss_next
+RANDOM = struct.Struct('<B625I?d')
+COLOR = struct.Struct('<IB')
+POINT = struct.Struct('<ii')
+
+NONE = -1  # None direction or co-ordinate
+NONE_CODE = 255  # None block code
+DIRECTIONS = (NONE, settings.MOVE_UP, settings.MOVE_DOWN, settings.MOVE_LEFT, settings.MOVE_RIGHT)
+
+
+def pack_ints(values):
+    """Little-endian bytes of int32 array"""
+    if sys.byteorder == 'big':
+        values = array('i', values)
+        values.byteswap()
+    return values.tobytes() if hasattr(values, 'tobytes') else values.tostring()
+
+
+def unpack_ints(data):
+    """int32 array from little-endian bytes"""
+    values = array('i')
+    if hasattr(values, 'frombytes'):
+        values.frombytes(data)
+    else:  # Python 2, bytes() of a memoryview is its repr there
+        values.fromstring(data.tobytes())
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def pick(values, indexes):
+    """Tuple of the values at given indexes, taken at C speed"""
+    if len(indexes) < 2:
+        return tuple(values[index] for index in indexes)
+    return itemgetter(*indexes)(values)
+
+
+def dump(arena):
+    """Dump arena state to bytes"""
+    under_head = arena.block_under_head
+    width = arena.width
+    chunks = [HEADER.pack(
+        MAGIC, VERSION, arena.width, arena.height,
+        arena.moves_all, arena.moves_from_eat, arena.eat_count,
+        NONE if arena.direction is None else arena.direction,
+        NONE if arena.prev_direction is None else arena.prev_direction,
+        arena.snake_length, len(arena.snake_body),
+        NONE_CODE if under_head is None else under_head.code,
+        NONE if arena.last_tail is None else arena.last_tail % width,
+        NONE if arena.last_tail is None else arena.last_tail // width,
+        len(arena.colors), len(arena.free),
+    )]
+
+    version, internal, gauss_next = arena.random.getstate()
+    chunks.append(RANDOM.pack(version, *(internal + (gauss_next is not None, gauss_next or 0.0))))
+
+    chunks.append(bytes(arena.grid))
+    chunks.extend(COLOR.pack(index, color) for index, color in arena.colors.items())
+    # Order of free blocks matters for food placement
+    chunks.append(pack_ints(arena.free))
+    chunks.append(pack_ints(arena.free_pos))
+    chunks.extend(POINT.pack(index % width, index // width) for index in arena.snake_body)
+    return b''.join(chunks)
+
+
+def load(data, track_touched=True):
+    """Load arena state from bytes (or any buffer)"""
+    data = memoryview(data)
+    try:
+        (magic, version, width, height, moves_all, moves_from_eat, eat_count, direction, prev_direction,
+         snake_length, length, under_head, last_tail_x, last_tail_y, colors_count, free_count) = HEADER.unpack_from(data)
+    except struct.error:
+        raise FileFormatError('Truncated state.')
+    if magic != MAGIC:
+        raise FileFormatError('Not a game state.')
+    if version not in (1, VERSION):
+        raise FileFormatError('Unsupported state version %s.' % version)
+    if width < 3 or height < 3:
+        raise FileFormatError('Bad arena size %dx%d.' % (width, height))
+    if direction not in DIRECTIONS or prev_direction not in DIRECTIONS:
+        raise FileFormatError('Bad direction.')
+    if under_head != NONE_CODE and under_head >= len(BLOCKS):
+        raise FileFormatError('Bad block code.')
+    area = width * height
+    if last_tail_x != NONE and not (0 <= last_tail_x < width and 0 <= last_tail_y < height):
+        raise FileFormatError('Bad last tail position.')
+    size = HEADER.size + RANDOM.size + area + COLOR.size * colors_count + 4 * free_count
+    if version > 1:
+        size += 4 * area
+    if len(data) < size:
+        raise FileFormatError('Truncated state.')
+    offset = HEADER.size
+
+    random_state = RANDOM.unpack_from(data, offset)
+    offset += RANDOM.size
+    grid = bytearray(data[offset:offset + area])
+    offset += area
+    if max(grid) >= len(BLOCKS):
+        raise FileFormatError('Bad block code.')
+    colors = {}
+    for _ in range(colors_count):
+        index, color = COLOR.unpack_from(data, offset)
+        if index >= area:
+            raise FileFormatError('Bad food position.')
+        colors[index] = color
+        offset += COLOR.size
+    free = unpack_ints(data[offset:offset + 4 * free_count])
+    offset += 4 * free_count
+    # Free blocks are all the empty ones, each once
+    if free and (min(free) < 0 or max(free) >= area):
+        raise FileFormatError('Bad free block position.')
+    if grid.count(bytearray([CODE_EFIR])) != free_count or any(code != CODE_EFIR for code in set(pick(grid, free))):
+        raise FileFormatError('Bad free blocks.')
+    if version > 1:
+        # Positions in the free blocks array, -1 for the other blocks
+        free_pos = unpack_ints(data[offset:offset + 4 * area])
+        if (min(free_pos) < -1 or free_pos.count(-1) != area - free_count or
+                pick(free_pos, free) != tuple(range(free_count))):
+            raise FileFormatError('Bad free blocks index.')
+        arena = Arena.from_grid(width, height, grid, free, free_pos, track_touched)
+        offset += 4 * area
+    else:
+        if len(set(free)) != free_count:
+            raise FileFormatError('Bad free blocks.')
+        arena = Arena(width, height, track_touched)
+        arena.grid[:] = grid
+        arena.reindex(free)
+    arena.colors = colors
+    try:
+        arena.random.setstate((random_state[0], random_state[1:626], random_state[627] if random_state[626] else None))
+    except (ValueError, TypeError):
+        raise FileFormatError('Bad random state.')
+
+    if len(data) < offset + POINT.size * length:
+        raise FileFormatError('Truncated state.')
+    # Older states pad the body with none blocks for growth
+    body = deque()
+    for _ in range(length):
+        x, y = POINT.unpack_from(data, offset)
+        if x != NONE:
+            if not (0 <= x < width and 0 <= y < height):
+                raise FileFormatError('Bad snake position.')
+            body.append(y * width + x)
+        offset += POINT.size
+    if not body or snake_length < len(body):
+        raise FileFormatError('Bad snake length.')
+    arena.snake_body = body
+    arena.snake_growth = snake_length - len(body)
+
+    arena.moves_all = moves_all
+    arena.moves_from_eat = moves_from_eat
+    arena.eat_count = eat_count
+    arena.direction = None if direction == NONE else direction
+    arena.prev_direction = None if prev_direction == NONE else prev_direction
+    head = arena.snake_head
+    arena.block_under_head = None if under_head == NONE_CODE else BLOCKS[under_head](head.x, head.y)
+    arena.last_tail = None if last_tail_x == NONE else last_tail_y * width + last_tail_x
+    arena.refresh()
+    return arena
+
+
+def save(arena, path):
+    """Save arena state to file"""
+    with open(path, 'wb') as f:
+        f.write(dump(arena))
+
+
+def resume(path, track_touched=True):
+    """Load arena state from file, the file is memory-mapped instead of read"""
+    with open(path, 'rb') as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Empty file
+            raise FileFormatError('Truncated state.')
+    return load(data, track_touched)  # The map is closed when collected
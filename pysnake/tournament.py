@@ -0,0 +1,204 @@
+"""
+Bot tournaments
+
+Plays games of bot policies on the headless engine in a process pool.
+A policy is a module level callable taking the Engine and returning
+the direction of the next step (or None to keep the current one).
+"""
+
+from array import array
+from importlib import import_module
+import argparse
+import multiprocessing
+import random
+import json
+
+from .arena import CODE_FOOD, CODE_EFIR
+from .engine import Engine
+from .exeptions import BorderException, BodyException, NoMoreSpace
+from . import settings
+
+DIRECTIONS = (settings.MOVE_UP, settings.MOVE_DOWN, settings.MOVE_LEFT, settings.MOVE_RIGHT)
+
+# Game end reasons
+REASONS = ('border', 'body', 'win', 'starved')
+REASON_CODES = {BorderException: 0, BodyException: 1, NoMoreSpace: 2}
+STARVED = 3
+
+FIELDS = 4  # score, length, moves, reason per game
+
+
+def random_policy(engine):
+    """Random turns"""
+    return random.choice(DIRECTIONS + (None,) * 4)
+
+
+def greedy_policy(engine):
+    """Step towards the food avoiding blocks that kill immediately"""
+    arena = engine.arena
+    grid, width = arena.grid, arena.width
+    head = arena.snake_head
+    food = grid.find(bytearray([CODE_FOOD]))
+    food_y, food_x = divmod(food, width) if food >= 0 else (head.y, head.x)
+    moves = (
+        (settings.MOVE_UP, 0, -1), (settings.MOVE_DOWN, 0, 1),
+        (settings.MOVE_LEFT, -1, 0), (settings.MOVE_RIGHT, 1, 0),
+    )
+    best = None
+    for direction, dx, dy in moves:
+        x, y = head.x + dx, head.y + dy
+        if grid[y * width + x] not in (CODE_EFIR, CODE_FOOD):
+            continue
+        distance = abs(food_x - x) + abs(food_y - y)
+        if best is None or distance < best[0]:
+            best = (distance, direction)
+    return best[1] if best is not None else None
+
+
+def play(policy, width, height, seed, max_moves_from_eat=None):
+    """Play one game, returns score, length, moves and end reason code"""
+    random.seed(seed)  # Policies using random module are reproducible too
+    engine = Engine(width, height, seed=seed)
+    arena = engine.arena
+    if max_moves_from_eat is None:
+        max_moves_from_eat = width * height
+    while True:
+        result = engine.step(policy(engine))
+        if result.done:
+            reason = REASON_CODES[type(result.error)]
+            break
+        if arena.moves_from_eat > max_moves_from_eat:
+            reason = STARVED
+            break
+    return engine.score, arena.snake_length, arena.moves_all, reason
+
+
+def play_shard(policy, width, height, seeds, max_moves_from_eat=None):
+    """Play games with given seeds, returns flat array of play() results"""
+    results = array('l')
+    for seed in seeds:
+        results.extend(play(policy, width, height, seed, max_moves_from_eat))
+    return results
+
+
+class Stats(object):
+    """Aggregate statistics of games of one policy on one arena size"""
+    def __init__(self):
+        self.games = 0
+        self.score = self.length = self.moves = 0
+        self.max_score = self.max_length = self.max_moves = 0
+        self.reasons = [0] * len(REASONS)
+
+    def add(self, results):
+        """Add flat array of play() results"""
+        for offset in range(0, len(results), FIELDS):
+            score, length, moves, reason = results[offset:offset + FIELDS]
+            self.games += 1
+            self.score += score
+            self.length += length
+            self.moves += moves
+            self.max_score = max(self.max_score, score)
+            self.max_length = max(self.max_length, length)
+            self.max_moves = max(self.max_moves, moves)
+            self.reasons[reason] += 1
+
+    def as_dict(self):
+        games = self.games or 1
+        result = {
+            'games': self.games,
+            'mean_score': self.score / float(games),
+            'mean_length': self.length / float(games),
+            'mean_moves': self.moves / float(games),
+            'max_score': self.max_score,
+            'max_length': self.max_length,
+            'max_moves': self.max_moves,
+        }
+        result.update(zip(REASONS, self.reasons))
+        return result
+
+
+def run(policies, sizes, games=100, workers=None, seed=0, max_moves_from_eat=None):
+    """
+    Play games of every policy on every arena size (width, height),
+    returns {(policy name, size): Stats}
+
+    Game i is played with seed + i for every policy and size,
+    games are sharded across worker processes (one per core by default).
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    workers = workers or multiprocessing.cpu_count()
+    seeds = list(range(seed, seed + games))
+    # Several shards per worker to balance the load, but not a task per game
+    shard_size = max(1, games // (workers * 4))
+
+    stats = {}
+    with ProcessPoolExecutor(workers) as executor:
+        futures = {}
+        for policy in policies:
+            name = policy_name(policy)
+            for size in sizes:
+                stats[name, size] = Stats()
+                for start in range(0, games, shard_size):
+                    future = executor.submit(play_shard, policy, size[0], size[1],
+                                             seeds[start:start + shard_size], max_moves_from_eat)
+                    futures[future] = name, size
+        for future in as_completed(futures):
+            stats[futures[future]].add(future.result())
+    return stats
+
+
+def policy_name(policy):
+    return '%s:%s' % (policy.__module__, policy.__name__)
+
+
+def load_policy(spec):
+    """Import policy by 'module:callable' spec"""
+    module, _, name = spec.partition(':')
+    return getattr(import_module(module), name)
+
+
+def parse_size(value):
+    width, _, height = value.partition('x')
+    try:
+        return int(width), int(height)
+    except ValueError:
+        raise argparse.ArgumentTypeError('size must be WIDTHxHEIGHT')
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='pysnake-tournament', description='Play games of Snake bots')
+    parser.add_argument('-p', '--policy', action='append', dest='policies', metavar='MODULE:CALLABLE',
+                        help='bot policy (default: the built-in random and greedy ones)')
+    parser.add_argument('-s', '--size', action='append', dest='sizes', type=parse_size, metavar='WxH',
+                        help='arena size (default: 40x20)')
+    parser.add_argument('-n', '--games', type=int, default=100, help='games per policy and size')
+    parser.add_argument('-j', '--workers', type=int, help='worker processes (default: one per core)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first game')
+    parser.add_argument('--max-moves-from-eat', type=int, help='moves without food before the snake starves')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    specs = args.policies or ['pysnake.tournament:random_policy', 'pysnake.tournament:greedy_policy']
+    try:
+        policies = [load_policy(spec) for spec in specs]
+    except (ImportError, AttributeError) as e:
+        parser.error(str(e))
+    sizes = args.sizes or [(40, 20)]
+
+    stats = run(policies, sizes, args.games, args.workers, args.seed, args.max_moves_from_eat)
+
+    rows = [dict(policy=name, size='%dx%d' % size, **stats[name, size].as_dict())
+            for name, size in sorted(stats)]
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    columns = ('policy', 'size', 'games', 'mean_score', 'max_score', 'mean_length', 'mean_moves') + REASONS
+    print(' '.join(column.rjust(12) for column in columns))
+    for row in rows:
+        print(' '.join(('%.1f' % row[column] if isinstance(row[column], float) else str(row[column])).rjust(12)
+                       for column in columns))
+
+
+if __name__ == '__main__':
+    main()
@@ -16,20 +16,26 @@ class WinKeysWrapper(WinWrapper):
         super(WinKeysWrapper, self).__init__(win)
         self.keypad(1)
         self.nodelay(nodelay)
+        self.nodelay_mode = nodelay
         self.key_code = None
         self.key_handlers = {}
 
+    def wrap(self, win):
+        """Replace wrapped window keeping key bindings"""
+        self.win = win
+        self.keypad(1)
+        self.nodelay(self.nodelay_mode)
+
     def getch(self, *args, **kwargs):
         self.key_code = self.win.getch(*args, **kwargs)
         return self.key_code
 
     def handle_key(self, key_code):
+        """Call the key's handler, unexpected keys are ignored (keys typed after them are kept)"""
         if key_code in self.key_handlers:
             return self.key_handlers[key_code]() or True  # Retutn something if handler exists
         elif 'any' in self.key_handlers:
             return self.key_handlers['any']() or True  # Retutn something if handler exists
-        else:
-            curses.flushinp()  # Flush all input buffers to empty all unexpected input
 
     def getch_and_handle(self):
         self.key_code = self.getch()
@@ -127,10 +133,9 @@ class GameQuitPopup(PopupWindow):
 class GameOverPopup(PopupWindow):
     def __init__(self, parent, message='Game Over', modal=True):
         super(GameOverPopup, self).__init__(parent, message, modal)
-        parent_keys = set(parent.get_keys())
-        move_keys = {settings.MOVE_DOWN, settings.MOVE_RIGHT, settings.MOVE_UP, settings.MOVE_LEFT}
-        pause_keys = set(map(ord, settings.KEYS_PAUSE))
-        self.bind(parent_keys - move_keys - pause_keys, self.propagate_key)
+        # A finished game is only started anew, rewound or quit, other keys would step it on
+        end_keys = set(map(ord, settings.KEYS_NEW_GAME + settings.KEYS_REWIND + settings.KEYS_EXIT))
+        self.bind(end_keys & set(parent.get_keys()), self.propagate_key)
 
 
 class GameWinPopup(GameOverPopup):
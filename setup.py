@@ -20,8 +20,17 @@ setup(
     author_email='otov4its@gmail.com',
 
     packages=find_packages(),
+    extras_require={
+        'batch': ['numpy'],
+        'tournament': ['futures; python_version < "3"'],
+    },
     entry_points={
-        'console_scripts': ['pysnake = pysnake.__main__:main']
+        'console_scripts': [
+            'pysnake = pysnake.__main__:main',
+            'pysnake-tournament = pysnake.tournament:main',
+            'pysnake-bench = pysnake.bench.__main__:main',
+            'pysnake-server = pysnake.server:main',
+        ]
     },
 
     keywords=['snake', 'game', 'zoom', 'rewind'],
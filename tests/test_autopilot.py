@@ -0,0 +1,36 @@
+"""
+Autopilot games on arenas with even and odd numbers of inner blocks
+"""
+
+import pytest
+
+from pysnake.autopilot import Autopilot
+from pysnake.engine import Engine
+from pysnake.exeptions import NoMoreSpace
+
+
+def play(width, height, seed, ticks=20000):
+    """Autopilot game, returns the engine and the step result it ended with (None if it goes on)"""
+    engine = Engine(width, height, seed=seed)
+    pilot = Autopilot()
+    for _ in range(ticks):
+        result = engine.step(pilot.decide(engine.arena))
+        if result.done:
+            return engine, result
+    return engine, None
+
+
+@pytest.mark.parametrize('size', [(6, 6), (9, 8), (10, 12), (14, 8)])
+def test_even_area_is_won(size):
+    for seed in range(10):
+        engine, result = play(size[0], size[1], seed)
+        assert result is not None and isinstance(result.error, NoMoreSpace)
+
+
+@pytest.mark.parametrize('size', [(7, 7), (9, 9)])
+def test_odd_area_is_filled(size):
+    # No cycle visits every block, the snake fills the arena but for a few blocks
+    area = (size[0] - 2) * (size[1] - 2)
+    for seed in range(10):
+        engine, result = play(size[0], size[1], seed)
+        assert len(engine.arena.snake_body) >= area - 3
@@ -0,0 +1,82 @@
+"""
+BatchEngine against Engine: the same games stepped side by side
+"""
+
+import random
+
+import pytest
+
+numpy = pytest.importorskip('numpy')
+
+from pysnake.batch import BatchEngine, DIRECTIONS, ALIVE, BORDER, BODY, WIN
+from pysnake.arena import CODE_FOOD, BlockFood
+from pysnake.engine import Engine
+from pysnake.exeptions import BorderException, BodyException, NoMoreSpace
+
+REASONS = {BorderException: BORDER, BodyException: BODY, NoMoreSpace: WIN}
+
+
+def mirror_food(engine, placed):
+    """Make the engine's arena put food where the batch did"""
+    arena = engine.arena
+
+    def new_food(num=1):
+        indexes = []
+        while placed and len(indexes) < num:
+            index = placed.pop()
+            y, x = divmod(index, arena.width)
+            arena.set_block(BlockFood(x, y, 1))
+            indexes.append(index)
+        return indexes
+    arena.new_food = new_food
+
+
+@pytest.mark.parametrize('size', [(4, 4), (5, 4), (8, 6), (12, 9)])
+def test_batch_follows_engine_rules(size):
+    width, height = size
+    n = 16
+    rnd = random.Random(width * height)
+    batch = BatchEngine(n, width, height, auto_reset=False, seed=1)
+    engines = [Engine(width, height, seed=i) for i in range(n)]
+    placed = [[] for _ in range(n)]
+    for engine, food in zip(engines, placed):
+        mirror_food(engine, food)
+    done = [False] * n
+    reasons = set()
+
+    for _ in range(300):
+        actions = [rnd.choice((-1, 0, 1, 2, 3)) for _ in range(n)]
+        before = batch.flat.copy()
+        result = batch.step(actions)
+        for i, engine in enumerate(engines):
+            if done[i]:
+                # Finished games are frozen
+                assert (batch.flat[i] == before[i]).all()
+                assert result.done[i] and not result.ate[i]
+                continue
+            new_food = set(numpy.flatnonzero(batch.flat[i] == CODE_FOOD)) - set(numpy.flatnonzero(before[i] == CODE_FOOD))
+            placed[i].extend(int(index) for index in new_food)
+            step = engine.step(DIRECTIONS[actions[i]] if actions[i] >= 0 else None)
+            arena = engine.arena
+            assert bytearray(batch.flat[i].tobytes()) == arena.grid
+            assert result.ate[i] == step.ate
+            assert result.done[i] == step.done
+            assert result.reason[i] == (REASONS[type(step.error)] if step.done else ALIVE)
+            assert result.score[i] == engine.score
+            assert result.length[i] == arena.snake_length
+            assert result.moves[i] == arena.moves_all
+            done[i] = step.done
+            reasons.add(result.reason[i])
+        if all(done):
+            break
+    assert BORDER in reasons or BODY in reasons
+
+
+def test_auto_reset_starts_new_games():
+    batch = BatchEngine(4, 6, 5, seed=0)
+    fresh = batch.flat.copy()
+    for _ in range(2):
+        result = batch.step([0] * 4)  # Up into the border
+    assert result.done.all() and (result.reason == BORDER).all()
+    assert (batch.flat == fresh).all()
+    assert (batch.moves_all == 0).all()